@@ -0,0 +1,197 @@
+"""Admission control: caps on concurrent in-flight API requests.
+
+Every API request belongs to a route class (auth, read, write, export) with a
+global cap, and authenticated requests also count against a per-user cap,
+keyed by the JWT `sub`. A request over a cap waits in a bounded queue until a
+slot frees up or ADMISSION_QUEUE_TIMEOUT_SECONDS passes. A request that finds
+the queue full, or times out, is shed with `Retry-After`: 429 when the user's
+own cap was hit, 503 when the route class is saturated. One user looping over
+exports therefore queues behind their own requests and cannot take every
+threadpool worker and DB connection from everyone else.
+
+Health checks, /metrics and the static frontend are never limited.
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from .auth import user_id_from_token
+
+
+def _limits(name: str, defaults: dict[str, int]) -> dict[str, int]:
+    """Per-class values from e.g. ADMISSION_LIMIT_EXPORT, falling back to the defaults"""
+    return {cls: int(os.getenv(f"{name}_{cls.upper()}", str(value))) for cls, value in defaults.items()}
+
+
+# Concurrent requests allowed per route class across all users
+CLASS_LIMITS = _limits("ADMISSION_LIMIT", {"auth": 16, "read": 64, "write": 32, "export": 4})
+# Requests allowed to wait for a slot per route class
+CLASS_QUEUE_SIZES = _limits("ADMISSION_QUEUE", {"auth": 64, "read": 256, "write": 128, "export": 16})
+# Concurrent requests per user, and how many more of theirs may wait
+USER_LIMIT = int(os.getenv("ADMISSION_USER_LIMIT", "8"))
+USER_QUEUE_SIZE = int(os.getenv("ADMISSION_USER_QUEUE", "16"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+API_PREFIXES = ("/auth", "/categories", "/transactions", "/balance", "/report", "/dashboard", "/export", "/import", "/sync", "/jobs")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """auth | export | write | read for API paths, None for everything that isn't limited"""
+    if not path.startswith(API_PREFIXES):
+        return None
+    if path.startswith("/auth"):
+        return "auth"
+    if path.startswith(("/export", "/import")):
+        return "export"
+    if method in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+class Limiter:
+    """At most `limit` holders; up to `queue_size` more wait in FIFO order"""
+
+    def __init__(self, limit: int, queue_size: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting: list[asyncio.Future] = []
+
+    async def acquire(self, deadline: float) -> Optional[str]:
+        """Take a slot; returns None on success or why the request was refused"""
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return None
+        if len(self.waiting) >= self.queue_size:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiting.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max(0.0, deadline - time.monotonic()))
+            return None
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return None  # the slot was handed over just as the deadline passed
+            return "timeout"
+        except asyncio.CancelledError:
+            # Client went away; pass on a slot that was already handed to us
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self.waiting:
+                self.waiting.remove(waiter)
+                waiter.cancel()
+
+    def release(self) -> None:
+        # Hand the slot straight to the next waiter, so newcomers can't overtake the queue
+        while self.waiting:
+            waiter = self.waiting.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @property
+    def idle(self) -> bool:
+        return self.active == 0 and not self.waiting
+
+
+_classes = {cls: Limiter(limit, CLASS_QUEUE_SIZES[cls]) for cls, limit in CLASS_LIMITS.items()}
+_users: dict[int, Limiter] = {}
+_shed: dict[tuple[str, str, str], int] = defaultdict(int)  # (class, scope, reason) -> count
+_admitted: dict[str, int] = defaultdict(int)
+
+
+def _user_id(scope) -> Optional[int]:
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return user_id_from_token(token)
+    except HTTPException:
+        return None  # the route answers 401 itself
+
+
+def _shed_response(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        cls = route_class(scope.get("method", ""), scope["path"]) if scope["type"] == "http" else None
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = time.monotonic() + QUEUE_TIMEOUT_SECONDS
+        user_id = _user_id(scope)
+        user_limiter = None
+        if user_id is not None:
+            user_limiter = _users.get(user_id)
+            if user_limiter is None:
+                user_limiter = _users[user_id] = Limiter(USER_LIMIT, USER_QUEUE_SIZE)
+            refused = await user_limiter.acquire(deadline)
+            if refused:
+                self._forget_if_idle(user_id, user_limiter)
+                _shed[(cls, "user", refused)] += 1
+                await _shed_response(429, "Too many concurrent requests")(scope, receive, send)
+                return
+
+        class_limiter = _classes[cls]
+        try:
+            refused = await class_limiter.acquire(deadline)
+            if refused:
+                _shed[(cls, "global", refused)] += 1
+                await _shed_response(503, "Server busy, try again shortly")(scope, receive, send)
+                return
+            _admitted[cls] += 1
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                class_limiter.release()
+        finally:
+            if user_limiter is not None:
+                user_limiter.release()
+                self._forget_if_idle(user_id, user_limiter)
+
+    @staticmethod
+    def _forget_if_idle(user_id: int, limiter: Limiter) -> None:
+        if limiter.idle and _users.get(user_id) is limiter:
+            del _users[user_id]
+
+
+def render() -> str:
+    """Admission metrics in the Prometheus text format, appended to /metrics"""
+    # Snapshots: the event loop keeps mutating these while /metrics renders in a worker thread
+    classes, users = list(_classes.items()), list(_users.values())
+    admitted, shed = sorted(_admitted.items()), sorted(_shed.items())
+    lines = [
+        "# HELP admission_in_flight Requests holding a slot by route class",
+        "# TYPE admission_in_flight gauge",
+        *(f'admission_in_flight{{class="{cls}"}} {limiter.active}' for cls, limiter in classes),
+        "# HELP admission_queue_depth Requests waiting for a slot by route class",
+        "# TYPE admission_queue_depth gauge",
+        *(f'admission_queue_depth{{class="{cls}"}} {len(limiter.waiting)}' for cls, limiter in classes),
+        "# HELP admission_user_queue_depth Requests waiting behind their own user's cap",
+        "# TYPE admission_user_queue_depth gauge",
+        f"admission_user_queue_depth {sum(len(limiter.waiting) for limiter in users)}",
+        "# HELP admission_admitted_total Requests admitted by route class",
+        "# TYPE admission_admitted_total counter",
+        *(f'admission_admitted_total{{class="{cls}"}} {count}' for cls, count in admitted),
+        "# HELP admission_shed_total Requests refused by route class, cap (user or global) and reason",
+        "# TYPE admission_shed_total counter",
+        *(f'admission_shed_total{{class="{cls}",scope="{scope}",reason="{reason}"}} {count}' for (cls, scope, reason), count in shed),
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,345 @@
+"""Monthly partitions of the transactions and an archive for cold history.
+
+On PostgreSQL `transactions` is partitioned by month of created_at
+(transactions_YYYY_MM, plus transactions_default for rows outside them), so a
+date-bounded query only reads the partitions its range touches.
+PARTITION_MONTHS_AHEAD upcoming months are created at startup. On SQLite,
+which has no partitioning, the table stays whole and the date indexes do the
+pruning.
+
+Months older than ARCHIVE_AFTER_MONTHS move to `transactions_archive`, keyed
+by (user_id, created_at, id) so each user's history is stored in time order:
+on PostgreSQL the month's partition is detached and attached to the archive
+(itself partitioned by month) without copying rows; on SQLite the rows are
+copied into a WITHOUT ROWID table and deleted from the hot one.
+
+Everything before the watermark in archive_state may be archived. Reads that
+reach below it (exports, the transaction list, /sync, unaligned reports)
+query the union of both tables through `source`; reads bounded above it only
+see the hot table. Archiving leaves the rollup as it is, so balances and
+hour-aligned reports keep counting archived transactions. Archived
+transactions keep their search documents. Editing or deleting an archived
+transaction moves it back first (`restore`).
+
+    python -m backend.app.archive status
+    python -m backend.app.archive partitions              # PostgreSQL: create upcoming partitions
+    python -m backend.app.archive run [--months N] [--compact]
+"""
+import argparse
+import os
+import re
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    Numeric,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.orm import Session, aliased
+
+from .db import engine
+from .models import ArchiveState, Transaction
+from . import search
+
+
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# Shared by the hot table and the archive, in this order
+COLUMNS = ("id", "amount", "note", "created_at", "updated_at", "version", "category_id", "user_id")
+
+# SQLite layout; on PostgreSQL the table is created by partition_tables() with the same columns
+transactions_archive = Table(
+    "transactions_archive",
+    MetaData(),
+    Column("id", Integer, nullable=False),
+    Column("amount", Numeric(12, 2)),
+    Column("note", String(255)),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime),
+    Column("version", Integer, nullable=False, server_default="0"),
+    Column("category_id", Integer),
+    Column("user_id", Integer, nullable=False),
+    PrimaryKeyConstraint("user_id", "created_at", "id"),
+    # Restoring one row, and /sync snapshots in id order
+    Index("ix_transactions_archive_user_id", "user_id", "id", unique=True),
+    Index("ix_transactions_archive_user_version", "user_id", "version"),
+    sqlite_with_rowid=False,
+)
+
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    years, index = divmod(month.month - 1 + months, 12)
+    return datetime(month.year + years, index + 1, 1)
+
+
+def archive_cutoff(months: int = ARCHIVE_AFTER_MONTHS, now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest month that stays hot"""
+    return add_months(month_start(now or datetime.utcnow()), -months)
+
+
+def archived_before(db: Session) -> Optional[datetime]:
+    """Watermark: transactions before it may be in the archive (None until the first run)"""
+    return db.scalar(select(ArchiveState.archived_before).where(ArchiveState.id == 1))
+
+
+def source(watermark: Optional[datetime], date_from: Optional[datetime] = None):
+    """Transaction, or an alias of it over hot + archived rows when [date_from, ...) reaches below the watermark"""
+    if watermark is None or (date_from is not None and date_from >= watermark):
+        return Transaction
+    hot = Transaction.__table__
+    union = union_all(
+        select(*(hot.c[name] for name in COLUMNS)),
+        select(*(transactions_archive.c[name] for name in COLUMNS)),
+    ).subquery("transactions_all")
+    return aliased(Transaction, union, adapt_on_names=True)
+
+
+def restore(db: Session, user_id: int, transaction_id: int) -> bool:
+    """Move an archived transaction back to the hot table (before it is edited or deleted)"""
+    found = transactions_archive.c.user_id == user_id, transactions_archive.c.id == transaction_id
+    if db.scalar(select(transactions_archive.c.id).where(*found)) is None:
+        return False
+    db.execute(insert(Transaction.__table__).from_select(
+        list(COLUMNS), select(*(transactions_archive.c[name] for name in COLUMNS)).where(*found)
+    ))
+    db.execute(delete(transactions_archive).where(*found))
+    return True
+
+
+def delete_category(db: Session, user_id: int, category_id: int) -> None:
+    """Delete the archived transactions of a category that is being deleted, and their search documents"""
+    found = transactions_archive.c.user_id == user_id, transactions_archive.c.category_id == category_id
+    # No trigger watches the archive
+    search.delete_documents(db, select(transactions_archive.c.id).where(*found))
+    db.execute(delete(transactions_archive).where(*found))
+
+
+def _set_watermark(bind, before: datetime) -> None:
+    with Session(bind) as db:
+        state = db.get(ArchiveState, 1)
+        if state is None:
+            db.add(ArchiveState(id=1, archived_before=before))
+        elif state.archived_before < before:
+            state.archived_before = before
+        db.commit()
+
+
+# --- PostgreSQL partitions ---
+
+def _bounds(month: datetime) -> str:
+    return f"FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+def _in_month(month: datetime) -> str:
+    return f"created_at >= '{month:%Y-%m-%d}' AND created_at < '{add_months(month, 1):%Y-%m-%d}'"
+
+
+def partitions(conn, parent: str = "transactions") -> dict[datetime, str]:
+    """Monthly partitions of `parent` by month"""
+    rows = conn.execute(text(
+        """SELECT c.relname FROM pg_inherits i
+           JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent
+           WHERE p.relname = :parent"""
+    ), {"parent": parent})
+    found = {}
+    for (name,) in rows:
+        match = re.match(rf"^{parent}_(\d{{4}})_(\d{{2}})$", name)
+        if match:
+            found[datetime(int(match.group(1)), int(match.group(2)), 1)] = name
+    return found
+
+
+def create_partition(conn, month: datetime) -> None:
+    """Partition of transactions for one month, taking over its rows from the default partition"""
+    name = f"transactions_{month:%Y_%m}"
+    columns = ", ".join(COLUMNS)
+    if conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM transactions_default WHERE {_in_month(month)})")):
+        # The default partition may not keep rows of a range that gets its own partition
+        conn.execute(text(f"CREATE TABLE {name} (LIKE transactions INCLUDING DEFAULTS)"))
+        conn.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM transactions_default WHERE {_in_month(month)}"))
+        conn.execute(text(f"DELETE FROM transactions_default WHERE {_in_month(month)}"))
+        conn.execute(text(f"ALTER TABLE transactions ATTACH PARTITION {name} FOR VALUES {_bounds(month)}"))
+        # The delete above dropped their search documents
+        conn.execute(text(search.PG_INDEX_ROWS.format(table=name)))
+    else:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF transactions FOR VALUES {_bounds(month)}"))
+
+
+def ensure_partitions(bind=engine, since: Optional[datetime] = None) -> list[str]:
+    """Create the monthly partitions from `since` (default: this month) through PARTITION_MONTHS_AHEAD months ahead"""
+    if bind.dialect.name != "postgresql":
+        return []
+    created = []
+    with bind.begin() as conn:
+        existing = partitions(conn)
+        month = month_start(since or datetime.utcnow())
+        last = add_months(month_start(datetime.utcnow()), PARTITION_MONTHS_AHEAD)
+        while month <= last:
+            if month not in existing:
+                create_partition(conn, month)
+                created.append(f"transactions_{month:%Y_%m}")
+            month = add_months(month, 1)
+    return created
+
+
+def partition_tables(conn, since: datetime) -> None:
+    """Partitioned transactions (empty, to be filled by the caller) and archive tables, for migration 3"""
+    conn.execute(text("CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"))
+    conn.execute(text("ALTER TABLE transactions ALTER COLUMN created_at SET NOT NULL"))
+    # The partition key has to be part of the primary key
+    conn.execute(text("ALTER TABLE transactions ADD PRIMARY KEY (id, created_at)"))
+    conn.execute(text("ALTER TABLE transactions ADD FOREIGN KEY (category_id) REFERENCES categories (id)"))
+    conn.execute(text("ALTER TABLE transactions ADD FOREIGN KEY (user_id) REFERENCES users (id)"))
+    conn.execute(text("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id"))
+    for index in Transaction.__table__.indexes:
+        index.create(bind=conn)
+    conn.execute(text("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT"))
+    month, last = month_start(since), add_months(month_start(datetime.utcnow()), PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        create_partition(conn, month)
+        month = add_months(month, 1)
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS transactions_archive (LIKE transactions, PRIMARY KEY (user_id, created_at, id))"
+        " PARTITION BY RANGE (created_at)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_transactions_archive_user_id ON transactions_archive (user_id, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_transactions_archive_user_version ON transactions_archive (user_id, version)"))
+    conn.execute(text("CREATE TABLE IF NOT EXISTS transactions_archive_default PARTITION OF transactions_archive DEFAULT"))
+
+
+def _archive_partition(conn, month: datetime, name: str, compact: bool) -> int:
+    """Detach one cold month from transactions and attach it to the archive; returns its row count"""
+    columns = ", ".join(COLUMNS)
+    conn.execute(text(f"ALTER TABLE transactions DETACH PARTITION {name}"))
+    # The archive is keyed by user; rows without one stay hot (in the default partition)
+    conn.execute(text(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM {name} WHERE user_id IS NULL"))
+    conn.execute(text(f"DELETE FROM {name} WHERE user_id IS NULL"))
+    # Keys and indexes of the hot table; the archive attaches its own
+    for (constraint,) in conn.execute(text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) AND contype IN ('p', 'u')"), {"t": name}).all():
+        conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {constraint}"))
+    for (index,) in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": name}).all():
+        conn.execute(text(f"DROP INDEX {index}"))
+    conn.execute(text(f"ALTER TABLE {name} ALTER COLUMN user_id SET NOT NULL"))
+    # Rows of this month archived earlier from the default partition
+    conn.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM transactions_archive_default WHERE {_in_month(month)}"))
+    conn.execute(text(f"DELETE FROM transactions_archive_default WHERE {_in_month(month)}"))
+    archived = f"transactions_archive_{month:%Y_%m}"
+    conn.execute(text(f"ALTER TABLE {name} RENAME TO {archived}"))
+    conn.execute(text(f"ALTER TABLE transactions_archive ATTACH PARTITION {archived} FOR VALUES {_bounds(month)}"))
+    if compact:
+        # Rewrite it in (user_id, created_at, id) order without dead rows; nobody writes to it any more
+        primary_key = conn.scalar(text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) AND contype = 'p'"), {"t": archived})
+        conn.execute(text(f"CLUSTER {archived} USING {primary_key}"))
+    return conn.scalar(text(f"SELECT count(*) FROM {archived}"))
+
+
+def _archive_postgres(bind, cutoff: datetime, compact: bool) -> int:
+    moved = 0
+    with bind.connect() as conn:
+        cold = sorted(month for month in partitions(conn) if add_months(month, 1) <= cutoff)
+    for month in cold:
+        with bind.begin() as conn:
+            moved += _archive_partition(conn, month, f"transactions_{month:%Y_%m}", compact)
+    # Old rows outside any monthly partition (e.g. imported with a date long past)
+    columns = ", ".join(COLUMNS)
+    stray = "created_at < :cutoff AND user_id IS NOT NULL"
+    with bind.begin() as conn:
+        moved += conn.execute(text(f"INSERT INTO transactions_archive ({columns}) SELECT {columns} FROM transactions_default WHERE {stray}"), {"cutoff": cutoff}).rowcount
+        conn.execute(text(f"DELETE FROM transactions_default WHERE {stray}"), {"cutoff": cutoff})
+    return moved
+
+
+# --- SQLite archive table ---
+
+def _archive_sqlite(bind, cutoff: datetime, compact: bool) -> int:
+    hot = Transaction.__table__
+    moved = 0
+    with bind.connect() as conn:
+        oldest = conn.scalar(select(func.min(hot.c.created_at)).where(hot.c.created_at < cutoff, hot.c.user_id.is_not(None)))
+    month = month_start(oldest) if oldest is not None else cutoff
+    # One month per transaction keeps the write lock short
+    while month < cutoff:
+        cold = hot.c.created_at >= month, hot.c.created_at < min(add_months(month, 1), cutoff), hot.c.user_id.is_not(None)
+        with bind.begin() as conn:
+            conn.execute(insert(transactions_archive).from_select(list(COLUMNS), select(*(hot.c[name] for name in COLUMNS)).where(*cold)))
+            # Already in the archive, so the search delete trigger keeps their documents
+            moved += conn.execute(delete(hot).where(*cold)).rowcount
+        month = add_months(month, 1)
+    if compact:
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    return moved
+
+
+def run(bind=engine, months: int = ARCHIVE_AFTER_MONTHS, compact: bool = False) -> int:
+    """Move transactions older than `months` whole months into the archive; returns how many moved"""
+    cutoff = archive_cutoff(months)
+    # Raise the watermark first: reads start including the archive before any row gets there
+    _set_watermark(bind, cutoff)
+    if bind.dialect.name == "postgresql":
+        ensure_partitions(bind)
+        return _archive_postgres(bind, cutoff, compact)
+    return _archive_sqlite(bind, cutoff, compact)
+
+
+def status(bind=engine) -> dict:
+    with Session(bind) as db:
+        report = {
+            "archived_before": archived_before(db),
+            "hot_rows": db.scalar(select(func.count()).select_from(Transaction)),
+            "archived_rows": db.scalar(select(func.count()).select_from(transactions_archive))
+            if inspect(db.connection()).has_table("transactions_archive") else 0,
+        }
+        if bind.dialect.name == "postgresql":
+            conn = db.connection()
+            report["partitions"] = sorted(partitions(conn).values())
+            report["archive_partitions"] = sorted(partitions(conn, "transactions_archive").values())
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain transaction partitions and the archive of cold history")
+    parser.add_argument("command", choices=["status", "partitions", "run"])
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS, help="keep this many whole months hot")
+    parser.add_argument("--compact", action="store_true", help="rewrite the archive compactly (VACUUM / CLUSTER)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        moved = run(engine, args.months, args.compact)
+        print(f"✅ Archived {moved} transactions from before {archive_cutoff(args.months):%Y-%m-%d}")
+    elif args.command == "partitions":
+        if engine.dialect.name != "postgresql":
+            parser.exit(message="Partitions are PostgreSQL only; SQLite keeps one transactions table\n")
+        with engine.connect() as conn:
+            oldest = conn.scalar(text("SELECT min(created_at) FROM transactions_default"))
+        # Also gives rows that landed in the default partition a monthly one, unless they are due for the archive
+        since = max(oldest, archive_cutoff(args.months)) if oldest is not None else None
+        created = ensure_partitions(engine, since)
+        print(f"✅ Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+    else:
+        for key, value in status(engine).items():
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
 import os
+import secrets
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from .db import get_db
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from .cache import TTLCache
+from .db import get_async_db
 from .models import User
 
 # Security configuration from environment variables
@@ -15,9 +20,61 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-product
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "10080"))  # 7 days default
 
+# In-process cache of decoded tokens and user principals. A cached principal is
+# dropped when this process flushes a change to that user through the ORM; a bulk
+# update(User) statement, a change made by another worker or directly in the
+# database is only seen once the entry expires, so a deactivated or edited user
+# can keep being served for up to AUTH_CACHE_TTL_SECONDS. Lower it (0 disables
+# the cache) where that window matters.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "10000"))
+
+# Bearer token for /metrics and the /health/* diagnostics; without one, only loopback clients may read them
+OPS_TOKEN = os.getenv("OPS_TOKEN", "")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1"}
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+token_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+principal_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Authenticated principal; a detached snapshot of the user row that is safe to cache"""
+    id: int
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=bool(user.is_active),
+            created_at=user.created_at,
+        )
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drop a cached principal so the next request reloads the user"""
+    principal_cache.pop(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User) -> None:
+    # Only this process, and only ORM unit-of-work flushes; see AUTH_CACHE_TTL_SECONDS
+    invalidate_principal(target.id)
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "principals": principal_cache.stats()}
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -55,12 +112,12 @@ def decode_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
-    token = credentials.credentials
+def user_id_from_token(token: str) -> int:
+    """Decode a bearer token to its user id, reusing earlier decodes until the token expires"""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
     payload = decode_token(token)
     user_id_str: str = payload.get("sub")
     
@@ -77,22 +134,44 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token format",
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+
+    # Never cache a token past its own expiry
+    token_cache.set(token, user_id, ttl=payload.get("exp", 0) - time.time())
+    return user_id
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    """Get current authenticated user from JWT token"""
+    user_id = user_id_from_token(credentials.credentials)
+
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await db.get(User, user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        principal = CurrentUser.from_user(user)
+        principal_cache.set(user_id, principal)
+
+    if not principal.is_active:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
         )
     
-    return user
+    return principal
 
 
 # Optional: For routes that don't require authentication
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[CurrentUser]:
     """Get current user if authenticated, None otherwise"""
     if not credentials:
         return None
@@ -102,3 +181,12 @@ async def get_current_user_optional(
         return None
 
 
+def require_ops_access(request: Request) -> None:
+    """Guard for operational endpoints: `Authorization: Bearer <OPS_TOKEN>`, or a loopback client if no token is set"""
+    if OPS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and secrets.compare_digest(token.encode(), OPS_TOKEN.encode()):
+            return
+    elif request.client is not None and request.client.host in LOOPBACK_HOSTS:
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
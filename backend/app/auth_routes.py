@@ -1,59 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from .db import get_db
-from .models import User, Category
-from .auth import get_password_hash, verify_password, create_access_token, get_current_user
+from .db import get_async_db
+from .models import User
+from .auth import CurrentUser, create_access_token, get_current_user
+from .hashing import hash_password, check_password
 from .schemas import UserRegister, UserLogin, UserResponse, Token
+from .provision import create_default_categories
+from .versions import bump as bump_data_version
 
 def create_default_categories_for_user(user_id: int, db: Session):
     """Create default categories for a new user"""
-    defaults: list[tuple[str, str]] = [
-        # Income (5)
-        ("Salary", "income"),
-        ("Business", "income"),
-        ("Dividends", "income"),
-        ("Gifts", "income"),
-        ("Other income", "income"),
-        # Expenses from provided list
-        ("Food", "expense"),
-        ("Eating Out", "expense"),
-        ("Clothes", "expense"),
-        ("Sport", "expense"),
-        ("Car", "expense"),
-        ("Household", "expense"),
-        ("Relaxation", "expense"),
-        ("Mobile", "expense"),
-        ("Internet", "expense"),
-        ("Insurance", "expense"),
-        ("Finance", "expense"),
-        ("DM", "expense"),
-        ("Home", "expense"),
-        ("Personal care", "expense"),
-        ("Electronics", "expense"),
-        ("Travel", "expense"),
-        ("Sharing", "expense"),
-        ("Charity", "expense"),
-        ("Medication", "expense"),
-        ("Education", "expense"),
-        ("Investing", "expense"),
-        ("Pets", "expense"),
-        ("Hobbys", "expense"),
-        ("Other", "expense"),
-        ("Children", "expense"),
-        ("Presents", "expense"),
-    ]
-    
-    for name, type_ in defaults:
-        # Check if category already exists for this user
-        existing = db.scalar(select(Category).where(
-            Category.name == name, 
-            Category.user_id == user_id
-        ))
-        if not existing:
-            category = Category(name=name, type=type_, user_id=user_id)
-            db.add(category)
-    
+    create_default_categories(db, [user_id], bump_data_version(db, user_id))
     db.commit()
 
 
@@ -61,10 +20,10 @@ router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.scalar(select(User).where(User.email == user_data.email))
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -72,7 +31,7 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -81,22 +40,24 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    # Create default categories for the new user
-    create_default_categories_for_user(new_user.id, db)
+    await db.flush()
+
+    # Create default categories for the new user in the same transaction
+    version = await db.run_sync(bump_data_version, new_user.id)
+    await db.run_sync(create_default_categories, [new_user.id], version)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login and get access token"""
     # Find user by email
-    user = db.scalar(select(User).where(User.email == user_data.email))
+    user = await db.scalar(select(User).where(User.email == user_data.email))
     
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user or not await check_password(user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -116,14 +77,14 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """Get current user info"""
     return current_user
 
 
 @router.post("/setup-default-categories")
-async def setup_default_categories(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def setup_default_categories(current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Create default categories for the current user (useful for existing users)"""
-    create_default_categories_for_user(current_user.id, db)
+    await db.run_sync(lambda session: create_default_categories_for_user(current_user.id, session))
     return {"message": "Default categories created successfully"}
 
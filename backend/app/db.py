@@ -1,33 +1,191 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 
 # Use environment variable for database URL, fallback to SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./backend/data.db")
 
+# Engine profile, shared by the sync and async engines (each has its own pool).
+# Size DB_POOL_SIZE + DB_MAX_OVERFLOW per process against the server's connection limit.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Pinging on every checkout costs a round trip per request; recycling usually suffices
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+# Compiled-statement cache of SQLAlchemy, and asyncpg's server-side prepared statement cache
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100"))
+
+# Pragmas applied to every new SQLite connection. WAL lets readers run next to the
+# single writer, synchronous=NORMAL is durable in WAL mode apart from the last commits
+# on power loss, and busy_timeout makes writers queue instead of failing with "locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB, i.e. 64 MiB
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+}
+
 
 class Base(DeclarativeBase):
     pass
 
 
-# Configure engine based on database type
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-    )
-else:
-    # PostgreSQL configuration
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300,
+class PoolWaitStats:
+    """How often and how long callers waited to check a connection out of a pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_total_ms": round(self.total_wait * 1000, 2),
+                "wait_avg_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.max_wait * 1000, 2),
+                "timeouts": self.timeouts,
+            }
+
+
+def _timed(pool_class):
+    """Subclass a queue pool so the time spent in checkout (queueing for a free
+    connection, or opening a new one) is recorded"""
+
+    class TimedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.wait_stats = PoolWaitStats()
+
+        def recreate(self):
+            # Keep the counters when the pool is recreated (e.g. after a disconnect)
+            new = super().recreate()
+            new.wait_stats = self.wait_stats
+            return new
+
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                self.wait_stats.record(0.0, timed_out=True)
+                raise
+            self.wait_stats.record(time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+TimedQueuePool = _timed(QueuePool)
+TimedAsyncQueuePool = _timed(AsyncAdaptedQueuePool)
+
+
+def is_sqlite_memory(url: str) -> bool:
+    return url.startswith("sqlite") and (url.endswith(":memory:") or url.rstrip("/").endswith(":"))
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """create_engine() keyword arguments for the profile matching the URL's database"""
+    options = {"query_cache_size": DB_STATEMENT_CACHE_SIZE}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {} if is_async else {"check_same_thread": False}
+        if is_sqlite_memory(url):
+            # A private in-memory database per connection; keep the dialect's default pool
+            return options
+    else:
+        options["pool_pre_ping"] = DB_POOL_PRE_PING
+        options["pool_recycle"] = DB_POOL_RECYCLE
+        if url.startswith("postgresql+asyncpg"):
+            options["connect_args"] = {"prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE}
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
     )
+    return options
+
+
+def apply_sqlite_pragmas(sync_engine) -> None:
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    scheme, sep, rest = url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme.startswith("postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+# Request handlers use the async engine; the sync one above serves CLI tools,
+# startup tasks and work that is pushed to the threadpool (exports, imports).
+# Set ASYNC_DATABASE_URL when the sync URL carries options asyncpg doesn't accept.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+
+if DATABASE_URL.startswith("sqlite"):
+    apply_sqlite_pragmas(engine)
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    apply_sqlite_pragmas(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes can't lazy-load after commit in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica for GET routes (see replica.py); without one, reads use the primary engines
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+ASYNC_DATABASE_READ_URL = os.getenv("ASYNC_DATABASE_READ_URL", to_async_url(DATABASE_READ_URL))
+
+if DATABASE_READ_URL:
+    read_engine = create_engine(DATABASE_READ_URL, **engine_options(DATABASE_READ_URL))
+    async_read_engine = create_async_engine(ASYNC_DATABASE_READ_URL, **engine_options(ASYNC_DATABASE_READ_URL, is_async=True))
+    if DATABASE_READ_URL.startswith("sqlite"):
+        apply_sqlite_pragmas(read_engine)
+    if ASYNC_DATABASE_READ_URL.startswith("sqlite"):
+        apply_sqlite_pragmas(async_read_engine.sync_engine)
+else:
+    read_engine, async_read_engine = engine, async_engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -36,3 +194,37 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats() -> dict:
+    """Live connection-pool numbers of every engine"""
+    stats = {}
+    pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+    if DATABASE_READ_URL:
+        pools += [("read_sync", read_engine.pool), ("read_async", async_read_engine.sync_engine.pool)]
+    for name, pool in pools:
+        entry = {"class": type(pool).__name__, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+                max_overflow=pool._max_overflow,
+            )
+        if hasattr(pool, "wait_stats"):
+            entry.update(pool.wait_stats.snapshot())
+        stats[name] = entry
+    return stats
+
+
+def dialect_insert(bind):
+    """Return the dialect's insert() construct, which supports ON CONFLICT clauses"""
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
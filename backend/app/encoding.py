@@ -0,0 +1,50 @@
+"""Content negotiation between JSON and MessagePack for the data endpoints.
+
+Clients that send `Accept: application/msgpack` get the same structure as
+the JSON body encoded as MessagePack: smaller, and cheaper to parse on the
+phone. Timestamps stay ISO 8601 strings so both representations decode to the
+same values. MessagePack is offered only when the msgpack module is installed.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Request headers the negotiated representation depends on (compression adds Accept-Encoding)
+VARY = "Accept"
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default)
+
+
+def wants_msgpack(request: Request) -> bool:
+    return msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def negotiated(request: Request, content: Any, response: Response) -> Response:
+    """`content` as MessagePack or JSON, whichever the client asked for, keeping headers set on `response`"""
+    response_class = MsgpackResponse if wants_msgpack(request) else ORJSONResponse
+    negotiated_response = response_class(content, headers=response.headers)
+    negotiated_response.headers["Vary"] = VARY
+    return negotiated_response
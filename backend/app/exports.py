@@ -0,0 +1,161 @@
+import csv
+from datetime import datetime
+from io import StringIO
+from typing import Iterator, Literal, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+
+from .db import SessionLocal
+from .models import Category, Transaction
+from . import archive
+
+
+# Rows fetched per round trip from the server-side cursor; also the CSV chunk size
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_COLUMNS = ["id", "created_at", "amount", "note", "category", "type"]
+
+# Rows per Arrow record batch / Parquet row group
+ARROW_BATCH_ROWS = 50000
+
+# Same columns as the CSV, typed; category and type are dictionary-encoded
+ARROW_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("created_at", pa.timestamp("us")),
+    ("amount", pa.decimal128(12, 2)),
+    ("note", pa.string()),
+    ("category", pa.dictionary(pa.int32(), pa.string())),
+    ("type", pa.dictionary(pa.int8(), pa.string())),
+])
+
+
+def export_statement(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    with_category_names: bool = True,
+    t=Transaction,
+):
+    """Build the export query for a user; the date range is half-open [date_from, date_to).
+
+    Without category names the last column is the category id and no join is made.
+    `t` is Transaction or, to include archived history, an archive.source alias of it.
+    """
+    columns = [t.id, t.created_at, t.amount, t.note]
+    if with_category_names:
+        stmt = select(*columns, Category.name, Category.type).join(Category, Category.id == t.category_id)
+    else:
+        stmt = select(*columns, t.category_id)
+    stmt = stmt.where(t.user_id == user_id).order_by(t.created_at, t.id)
+    if date_from is not None:
+        stmt = stmt.where(t.created_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(t.created_at < date_to)
+    if category_id is not None:
+        stmt = stmt.where(t.category_id == category_id)
+    return stmt
+
+
+def iter_csv(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    session_factory=SessionLocal,
+) -> Iterator[str]:
+    """Yield the user's transactions as CSV text, one chunk per cursor batch.
+
+    The generator owns its session so the cursor stays open while the response
+    is being streamed, and only one batch of rows is held in memory at a time.
+    """
+    buf = StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    yield buf.getvalue()
+
+    with session_factory() as db:
+        stmt = export_statement(user_id, date_from, date_to, category_id, t=archive.source(archive.archived_before(db), date_from))
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        for rows in result.partitions():
+            buf.seek(0)
+            buf.truncate(0)
+            writer.writerows(rows)
+            yield buf.getvalue()
+
+
+class ChunkSink:
+    """Write-only file object for the Arrow writers; `drain` hands back what was written since the last call"""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_arrow(
+    user_id: int,
+    file_format: Literal["parquet", "arrow"],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    session_factory=SessionLocal,
+) -> Iterator[bytes]:
+    """Yield the user's transactions as a Parquet or Arrow IPC file, one record batch at a time.
+
+    Category names and types come from one small query up front, so every batch
+    shares the same dictionaries and the main query needs no join.
+    """
+    with session_factory() as db:
+        categories = db.execute(
+            select(Category.id, Category.name, Category.type).where(Category.user_id == user_id).order_by(Category.id)
+        ).all()
+        category_index = {id_: i for i, (id_, _, _) in enumerate(categories)}
+        category_names = pa.array([name for _, name, _ in categories], pa.string())
+        type_names = sorted({type_ for _, _, type_ in categories if type_ is not None})
+        type_index = {id_: type_names.index(type_) if type_ is not None else None for id_, _, type_ in categories}
+        type_dictionary = pa.array(type_names, pa.string())
+
+        sink = ChunkSink()
+        if file_format == "parquet":
+            writer = pq.ParquetWriter(sink, ARROW_SCHEMA, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(sink, ARROW_SCHEMA, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+        t = archive.source(archive.archived_before(db), date_from)
+        stmt = export_statement(user_id, date_from, date_to, category_id, with_category_names=False, t=t)
+        result = db.execute(stmt.execution_options(yield_per=ARROW_BATCH_ROWS))
+        for rows in result.partitions():
+            ids, created_at, amounts, notes, category_ids = zip(*rows)
+            writer.write_batch(pa.RecordBatch.from_arrays([
+                pa.array(ids, pa.int64()),
+                pa.array(created_at, pa.timestamp("us")),
+                pa.array(amounts, pa.decimal128(12, 2)),
+                pa.array(notes, pa.string()),
+                pa.DictionaryArray.from_arrays(pa.array([category_index.get(c) for c in category_ids], pa.int32()), category_names),
+                pa.DictionaryArray.from_arrays(pa.array([type_index.get(c) for c in category_ids], pa.int8()), type_dictionary),
+            ], schema=ARROW_SCHEMA))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from .auth import get_password_hash, verify_password
+
+
+# bcrypt runs in its own processes so a login burst cannot starve the request threadpool.
+# PASSWORD_HASH_WORKERS=0 hashes inline in the calling thread (handy for local debugging).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Hash jobs allowed to be running or queued at once; anything beyond that gets a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(PASSWORD_HASH_WORKERS, 1) * 4)))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn instead of fork: the server process is multi-threaded by the time we get here
+                _pool = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def start_pool() -> None:
+    """Spawn the hashing workers up front so the first logins don't pay the process start-up"""
+    if PASSWORD_HASH_WORKERS > 0:
+        pool = _get_pool()
+        for _ in range(PASSWORD_HASH_WORKERS):
+            pool.submit(os.getpid)
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _run(fn, *args):
+    if not _pending.acquire(blocking=False):
+        raise _busy()
+    if PASSWORD_HASH_WORKERS <= 0:
+        try:
+            return await run_in_threadpool(fn, *args)
+        finally:
+            _pending.release()
+    try:
+        job = _get_pool().submit(fn, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    # A timed-out job keeps its worker busy until bcrypt returns, so the slot is
+    # only freed once the job itself finishes (or is cancelled before it starts)
+    job.add_done_callback(lambda _: _pending.release())
+    try:
+        # Awaiting the worker's future keeps both the event loop and the threadpool free
+        return await asyncio.wait_for(asyncio.wrap_future(job), timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        # The workers are backed up; answer like a full queue rather than with a 500
+        raise _busy() from None
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the bcrypt worker pool"""
+    return await _run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bcrypt worker pool"""
+    return await _run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,156 @@
+import codecs
+import csv
+from datetime import datetime
+from io import StringIO
+from typing import BinaryIO, Iterable
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from .models import Category, Transaction
+from . import rollup, versions
+from .schemas import ImportResult, ImportRowError, TransactionCreate
+
+
+# Rows written per executemany / COPY round trip
+INGEST_BATCH_SIZE = 1000
+# Per-row errors echoed back to the client; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+COPY_COLUMNS = ("amount", "note", "created_at", "category_id", "user_id", "updated_at", "version")
+
+
+class TransactionImporter:
+    """Validates rows against the user's categories and inserts them in batches.
+
+    Categories are loaded once up front, so validation costs no queries. Valid
+    rows are buffered and written with a single executemany (COPY on
+    PostgreSQL) per batch, together with the matching rollup update; invalid
+    rows are reported with their row number. Nothing is committed until
+    `finish`, so an import either lands completely or not at all.
+    """
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        rows = db.execute(select(Category.id, Category.name).where(Category.user_id == user_id)).all()
+        self.category_ids = {id_ for id_, _ in rows}
+        self.category_by_name = {name.casefold(): id_ for id_, name in rows}
+        self.pending: list[dict] = []
+        self.inserted = 0
+        self.failed = 0
+        self.errors: list[ImportRowError] = []
+        self.now = datetime.utcnow()
+        # Data version stamped on the imported rows, taken with the first batch
+        self.version = None
+
+    def error(self, row: int, detail: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(ImportRowError(row=row, detail=detail))
+
+    def add(self, row: int, data: dict) -> None:
+        """Validate one row (TransactionCreate fields, or a category name instead of category_id)"""
+        if not isinstance(data, dict):
+            self.error(row, "Expected an object")
+            return
+        if data.get("category_id") in (None, "") and data.get("category"):
+            category_id = self.category_by_name.get(str(data["category"]).strip().casefold())
+            if category_id is None:
+                self.error(row, f"Unknown category '{data['category']}'")
+                return
+            data = {**data, "category_id": category_id}
+        data = {k: v for k, v in data.items() if v not in (None, "")}
+
+        try:
+            item = TransactionCreate.model_validate(data)
+        except ValidationError as e:
+            first = e.errors()[0]
+            field = ".".join(str(part) for part in first["loc"])
+            self.error(row, f"{field}: {first['msg']}" if field else first["msg"])
+            return
+        if item.category_id not in self.category_ids:
+            self.error(row, "Invalid category")
+            return
+
+        self.pending.append({
+            "amount": item.amount,
+            "note": item.note,
+            "created_at": item.created_at or self.now,
+            "category_id": item.category_id,
+            "user_id": self.user_id,
+            "updated_at": self.now,
+        })
+        if len(self.pending) >= INGEST_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        if self.version is None:
+            self.version = versions.bump(self.db, self.user_id)
+        for r in self.pending:
+            r["version"] = self.version
+        if not self._copy(self.pending):
+            self.db.execute(insert(Transaction), self.pending)
+        rollup.add_rows(self.db, self.pending)
+        self.inserted += len(self.pending)
+        self.pending = []
+
+    def _copy(self, rows: list[dict]) -> bool:
+        """Stream a batch through COPY when running on psycopg2; returns False if unavailable"""
+        if self.db.get_bind().dialect.driver != "psycopg2":
+            return False
+        buf = StringIO()
+        writer = csv.writer(buf)
+        for r in rows:
+            writer.writerow([r["amount"], r["note"] if r["note"] is not None else r"\N", r["created_at"].isoformat(), r["category_id"], r["user_id"], r["updated_at"].isoformat(), r["version"]])
+        buf.seek(0)
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY transactions ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf,
+            )
+        finally:
+            cursor.close()
+        return True
+
+    def finish(self) -> ImportResult:
+        self.flush()
+        self.db.commit()
+        return ImportResult(inserted=self.inserted, failed=self.failed, errors=self.errors)
+
+
+def import_rows(db: Session, user_id: int, rows: Iterable[dict]) -> ImportResult:
+    """Import JSON objects; row numbers are 0-based indexes into the submitted array"""
+    importer = TransactionImporter(db, user_id)
+    for index, data in enumerate(rows):
+        importer.add(index, data)
+    return importer.finish()
+
+
+def import_csv_file(db: Session, user_id: int, file: BinaryIO) -> ImportResult:
+    """Import a CSV upload with a header row, decoding and parsing it incrementally.
+
+    Recognised columns are amount, created_at, note and either category_id or
+    category (name); other columns such as those in /export/csv are ignored.
+    Row numbers are 1-based data rows, not counting the header.
+    """
+    importer = TransactionImporter(db, user_id)
+    reader = csv.DictReader(codecs.iterdecode(file, "utf-8-sig"))
+    try:
+        for index, data in enumerate(reader, start=1):
+            importer.add(index, {
+                "amount": data.get("amount"),
+                "created_at": data.get("created_at"),
+                "note": data.get("note"),
+                "category_id": data.get("category_id"),
+                "category": data.get("category"),
+            })
+    except (UnicodeDecodeError, csv.Error) as e:
+        importer.error(reader.line_num, f"Unreadable CSV: {e}")
+        db.rollback()
+        return ImportResult(inserted=0, failed=importer.failed, errors=importer.errors)
+    return importer.finish()
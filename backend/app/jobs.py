@@ -0,0 +1,243 @@
+"""Background jobs for large exports and long-range reports.
+
+POST /jobs/export and POST /jobs/report answer 202 right away with a job; a
+small local thread pool runs it and writes the result to a file under
+JOBS_DIR, which GET /jobs/{id}/result downloads until it expires after
+JOB_RESULT_TTL_SECONDS. A result is keyed by the request parameters and the
+user's data version, so asking for the same thing again before the user
+changes anything returns the finished (or still running) job instead of
+starting another one.
+
+The pool has JOB_WORKERS threads of its own, apart from the request
+threadpool, and at most JOB_MAX_ACTIVE jobs (JOB_USER_MAX_ACTIVE per user) may
+be queued or running at once; beyond that POST answers 503 / 429 with
+Retry-After. A burst of exports therefore waits its turn instead of taking
+threads and DB connections from interactive requests.
+
+Jobs run in the process that accepted them. One that was still queued or
+running when the process stopped just expires with the others; clients
+submit it again.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import SessionLocal
+from .models import Job, UserDataVersion
+from .replica import read_sessionmaker
+
+
+JOBS_DIR = Path(os.getenv("JOBS_DIR", os.path.join(tempfile.gettempdir(), "finance-jobs")))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ACTIVE = int(os.getenv("JOB_MAX_ACTIVE", "32"))
+JOB_USER_MAX_ACTIVE = int(os.getenv("JOB_USER_MAX_ACTIVE", "2"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+
+# kind -> (media type, download file name)
+RESULT_TYPES = {
+    "export_csv": ("text/csv", "transactions.csv"),
+    "export_parquet": ("application/vnd.apache.parquet", "transactions.parquet"),
+    "export_arrow": ("application/vnd.apache.arrow.file", "transactions.arrow"),
+    "report_range": ("application/json", "report.json"),
+}
+
+# Writes the result, reading through the session factory it is given
+Producer = Callable[[sessionmaker[Session]], Iterable[bytes | str]]
+
+_pool: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_active: dict[tuple[int, str, int], str] = {}  # (user id, params key, data version) -> queued or running job id
+_finished: dict[tuple[str, str], int] = defaultdict(int)  # (kind, status) -> count
+_reused: dict[str, int] = defaultdict(int)
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Drop queued jobs; running ones finish in the background"""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def result_path(job_id: str) -> Path:
+    return JOBS_DIR / job_id
+
+
+def params_key(kind: str, params: dict) -> str:
+    return hashlib.sha256(orjson.dumps([kind, params], option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _data_version(db: Session, user_id: int) -> int:
+    return db.scalar(select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)) or 0
+
+
+def submit(user_id: int, kind: str, params: dict, produce: Producer) -> Job:
+    """Return a job for `kind` + `params` at the user's current data version, starting one if needed"""
+    evict_expired()
+    key = params_key(kind, params)
+    with SessionLocal() as db:
+        version = _data_version(db, user_id)
+        active_key = (user_id, key, version)
+        job_id = _active.get(active_key)
+        if job_id is None:
+            # A result computed at this version is still exactly what the user would get now
+            job = db.scalars(
+                select(Job)
+                .where(
+                    Job.user_id == user_id,
+                    Job.params_key == key,
+                    Job.data_version == version,
+                    Job.status == "done",
+                    Job.expires_at > datetime.utcnow(),
+                )
+                .limit(1)
+            ).first()
+            if job is not None and result_path(job.id).exists():
+                _reused[kind] += 1
+                return job
+
+        with _lock:
+            job_id = _active.get(active_key)
+            if job_id is None:
+                if len(_active) >= JOB_MAX_ACTIVE:
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="Too many background jobs, try again shortly",
+                        headers={"Retry-After": "5"},
+                    )
+                if sum(1 for uid, _, _ in _active if uid == user_id) >= JOB_USER_MAX_ACTIVE:
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail="Wait for your running jobs to finish",
+                        headers={"Retry-After": "5"},
+                    )
+                job_id = uuid.uuid4().hex
+                _active[active_key] = job_id
+                created = True
+            else:
+                created = False
+        if not created:
+            _reused[kind] += 1
+            return db.get(Job, job_id)
+
+        try:
+            now = datetime.utcnow()
+            job = Job(
+                id=job_id,
+                user_id=user_id,
+                kind=kind,
+                params_key=key,
+                data_version=version,
+                status="queued",
+                created_at=now,
+                expires_at=now + timedelta(seconds=JOB_RESULT_TTL_SECONDS),
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            _get_pool().submit(_run, job_id, kind, active_key, produce)
+        except BaseException:
+            with _lock:
+                _active.pop(active_key, None)
+            raise
+        return job
+
+
+def _set(job_id: str, **values) -> None:
+    with SessionLocal() as db:
+        db.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.commit()
+
+
+def _run(job_id: str, kind: str, active_key: tuple[int, str, int], produce: Producer) -> None:
+    user_id, _, version = active_key
+    path = result_path(job_id)
+    partial = path.with_suffix(".part")
+    try:
+        _set(job_id, status="running")
+        session_factory = read_sessionmaker(user_id)
+        if session_factory is not SessionLocal:
+            with session_factory() as db:
+                if _data_version(db, user_id) < version:
+                    session_factory = SessionLocal  # the replica hasn't caught up with what was asked for
+        JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        size = 0
+        with open(partial, "wb") as f:
+            for chunk in produce(session_factory):
+                data = chunk.encode() if isinstance(chunk, str) else chunk
+                f.write(data)
+                size += len(data)
+        os.replace(partial, path)
+        finished = datetime.utcnow()
+        _set(
+            job_id,
+            status="done",
+            size=size,
+            finished_at=finished,
+            expires_at=finished + timedelta(seconds=JOB_RESULT_TTL_SECONDS),
+        )
+        _finished[(kind, "done")] += 1
+    except Exception as e:
+        print(f"Job {job_id} failed: {e}")
+        partial.unlink(missing_ok=True)
+        _set(job_id, status="failed", error=str(e)[:500], finished_at=datetime.utcnow())
+        _finished[(kind, "failed")] += 1
+    finally:
+        with _lock:
+            _active.pop(active_key, None)
+
+
+def evict_expired() -> int:
+    """Delete expired jobs and their result files; returns how many were removed"""
+    with SessionLocal() as db:
+        expired = db.scalars(select(Job.id).where(Job.expires_at <= datetime.utcnow())).all()
+        with _lock:
+            running = set(_active.values())
+        expired = [job_id for job_id in expired if job_id not in running]
+        if not expired:
+            return 0
+        for job_id in expired:
+            result_path(job_id).unlink(missing_ok=True)
+        db.execute(delete(Job).where(Job.id.in_(expired)))
+        db.commit()
+    return len(expired)
+
+
+def render() -> str:
+    """Job pool metrics in the Prometheus text format, appended to /metrics"""
+    with _lock:
+        active = len(_active)
+    finished, reused = sorted(_finished.items()), sorted(_reused.items())
+    lines = [
+        "# HELP jobs_active Background jobs queued or running in this process",
+        "# TYPE jobs_active gauge",
+        f"jobs_active {active}",
+        "# HELP jobs_finished_total Background jobs finished by kind and status",
+        "# TYPE jobs_finished_total counter",
+        *(f'jobs_finished_total{{kind="{kind}",status="{outcome}"}} {count}' for (kind, outcome), count in finished),
+        "# HELP jobs_reused_total Job requests answered with an existing job for unchanged data",
+        "# TYPE jobs_reused_total counter",
+        *(f'jobs_reused_total{{kind="{kind}"}} {count}' for kind, count in reused),
+    ]
+    return "\n".join(lines) + "\n"
@@ -1,18 +1,26 @@
 import os
 from pathlib import Path
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from .routes import router, init_db
 from .auth_routes import router as auth_router
+from .auth import auth_cache_stats, require_ops_access
+from .db import DATABASE_READ_URL, async_engine, async_read_engine, engine, pool_stats, read_engine
+from .admission import AdmissionMiddleware, render as render_admission
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware, instrument_engine, render as render_metrics
+from .replica import WrittenVersionMiddleware, render as render_routing
+from .jobs import evict_expired, render as render_jobs, shutdown_pool as shutdown_job_pool
+from .hashing import start_pool, shutdown_pool
+from .static import SPAStaticFiles, precompress
 
 # Load environment variables
 load_dotenv()
 
 
-app = FastAPI(title="AI Freelance Manager - Finance API", version="0.1.0")
+app = FastAPI(title="AI Freelance Manager - Finance API", version="0.1.0", default_response_class=ORJSONResponse)
 
 # Configure CORS based on environment
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*")
@@ -21,60 +29,81 @@ if allowed_origins != "*":
 else:
     allowed_origins = ["*"]
 
+# Innermost, so 429/503 responses still get CORS headers and show up in the metrics
+app.add_middleware(AdmissionMiddleware)
+
+# Tells clients the data version they wrote, for replica routing (see replica.py)
+app.add_middleware(WrittenVersionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "ETag", "Retry-After", "Location", "X-Written-Version"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
+# Outermost middleware, so latency covers CORS handling and the whole streamed body
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if DATABASE_READ_URL:
+    instrument_engine(read_engine)
+    instrument_engine(async_read_engine.sync_engine)
+
 
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
 
 
+# Operational diagnostics: not for the public port
+@app.get("/health/cache", dependencies=[Depends(require_ops_access)])
+def health_cache() -> dict:
+    return auth_cache_stats()
+
+
+@app.get("/health/db", dependencies=[Depends(require_ops_access)])
+def health_db() -> dict:
+    return pool_stats()
+
+
+@app.get("/metrics", dependencies=[Depends(require_ops_access)])
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics() + render_admission() + render_routing() + render_jobs(), media_type="text/plain; version=0.0.4")
+
+
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    start_pool()
+    evict_expired()
+    if frontend_dist.exists():
+        try:
+            precompress(frontend_dist)
+        except OSError as e:
+            # Read-only deployments: serve whatever variants the build shipped
+            print(f"Could not precompress frontend assets: {e}")
 
 
-# Mount static files for frontend assets BEFORE including router
-frontend_dist = Path(__file__).parent.parent.parent / "frontend" / "dist"
-if frontend_dist.exists():
-    # Serve static assets
-    app.mount("/assets", StaticFiles(directory=str(frontend_dist / "assets")), name="assets")
-    
-    # Serve vite.svg
-    @app.get("/vite.svg")
-    async def serve_vite_svg():
-        vite_svg = frontend_dist / "vite.svg"
-        if vite_svg.exists():
-            return FileResponse(vite_svg)
-        return {"error": "Not found"}
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    shutdown_pool()
+    shutdown_job_pool()
+    await async_engine.dispose()
+    if DATABASE_READ_URL:
+        await async_read_engine.dispose()
+
 
 # Include API routes
 app.include_router(auth_router)
 app.include_router(router)
 
-# Custom 404 handler to serve SPA for non-API routes
-@app.exception_handler(404)
-async def not_found_handler(request: Request, exc):
-    # If it's an API route, return JSON error
-    if request.url.path.startswith("/api/") or request.url.path.startswith("/auth/") or request.url.path in ["/health", "/categories", "/transactions", "/balance", "/export/csv"] or "/report/" in request.url.path:
-        return JSONResponse(
-            status_code=404,
-            content={"detail": "Not found"}
-        )
-    
-    # Otherwise, serve the SPA
-    index_file = frontend_dist / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
-    return JSONResponse(
-        status_code=404,
-        content={"detail": "Frontend not found"}
-    )
-
-
+# The built frontend is mounted last, so every API route above matches first;
+# unknown paths requested as HTML get the SPA shell, anything else a JSON 404
+frontend_dist = Path(__file__).parent.parent.parent / "frontend" / "dist"
+if (frontend_dist / "index.html").exists():
+    app.mount("/", SPAStaticFiles(directory=frontend_dist), name="frontend")
@@ -0,0 +1,223 @@
+"""Per-route request and database metrics, exposed in Prometheus text format.
+
+`MetricsMiddleware` times every request and labels it with the route template
+(e.g. `/transactions/{transaction_id}`). SQLAlchemy cursor hooks attribute each
+statement to the request that issued it, so every route gets its SQL statement
+count, DB time and rows, plus a statements-per-request histogram in which N+1
+patterns stand out.
+
+Set SLOW_QUERY_MS to print statements slower than that, with their route.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+
+# Statements slower than this are printed with the route that issued them; 0 disables the log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class RequestStats:
+    """Database work done on behalf of one request"""
+
+    __slots__ = ("scope", "statements", "db_time", "rows", "slow_queries")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.slow_queries = 0
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the request scope before calling the endpoint
+        route = self.scope.get("route")
+        return route.path if route is not None else "unmatched"
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements_per_request = Histogram(STATEMENT_BUCKETS)
+        self.statuses: dict[int, int] = {}
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.slow_queries = 0
+
+
+_lock = threading.Lock()
+_routes: dict[tuple[str, str], RouteMetrics] = {}
+
+
+def _route_metrics(method: str, route: str) -> RouteMetrics:
+    key = (method, route)
+    metrics = _routes.get(key)
+    if metrics is None:
+        metrics = _routes[key] = RouteMetrics()
+    return metrics
+
+
+def record_request(method: str, stats: RequestStats, status: int, elapsed: float) -> None:
+    with _lock:
+        metrics = _route_metrics(method, stats.route)
+        metrics.latency.observe(elapsed)
+        metrics.statements_per_request.observe(stats.statements)
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.statements += stats.statements
+        metrics.db_time += stats.db_time
+        metrics.rows += stats.rows
+        metrics.slow_queries += stats.slow_queries
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed bodies (CSV export) are timed to the last chunk"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+        finished = False
+
+        def finish() -> None:
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            record_request(scope["method"], stats, status, time.perf_counter() - started)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _current.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.db_time += elapsed
+    # rowcount is the number of rows returned/affected on PostgreSQL; SQLite reports -1 for SELECTs
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        stats.slow_queries += 1
+        print(f"🐢 Slow query ({elapsed * 1000:.1f} ms) in {stats.scope['method']} {stats.route}: {' '.join(statement.split())[:1000]}")
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(sync_engine) -> None:
+    """Attach the query accounting hooks to an engine (for async engines pass .sync_engine)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: dict) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}")
+    lines.append(f"{name}_bucket{{{_labels(**labels, le='+Inf')}}} {histogram.count}")
+    lines.append(f"{name}_sum{{{_labels(**labels)}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{_labels(**labels)}}} {histogram.count}")
+    return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    with _lock:
+        routes = sorted(_routes.items())
+        sections = {
+            "http_requests_total": ("counter", "Requests by route template and status code", []),
+            "http_request_duration_seconds": ("histogram", "Request latency by route template", []),
+            "db_statements_per_request": ("histogram", "SQL statements issued per request", []),
+            "db_statements_total": ("counter", "SQL statements issued by route template", []),
+            "db_query_seconds_total": ("counter", "Time spent executing SQL by route template", []),
+            "db_rows_total": ("counter", "Rows returned or affected, as reported by the driver (SQLite counts no SELECT rows)", []),
+            "db_slow_queries_total": ("counter", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g})", []),
+        }
+        for (method, route), m in routes:
+            labels = {"method": method, "route": route}
+            for status, count in sorted(m.statuses.items()):
+                sections["http_requests_total"][2].append(f"http_requests_total{{{_labels(**labels, status=status)}}} {count}")
+            sections["http_request_duration_seconds"][2].extend(_histogram_lines("http_request_duration_seconds", m.latency, labels))
+            sections["db_statements_per_request"][2].extend(_histogram_lines("db_statements_per_request", m.statements_per_request, labels))
+            sections["db_statements_total"][2].append(f"db_statements_total{{{_labels(**labels)}}} {m.statements}")
+            sections["db_query_seconds_total"][2].append(f"db_query_seconds_total{{{_labels(**labels)}}} {m.db_time}")
+            sections["db_rows_total"][2].append(f"db_rows_total{{{_labels(**labels)}}} {m.rows}")
+            sections["db_slow_queries_total"][2].append(f"db_slow_queries_total{{{_labels(**labels)}}} {m.slow_queries}")
+
+    lines = []
+    for name, (kind, help_text, samples) in sections.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,188 @@
+"""Versioned schema migrations.
+
+Each migration has a number, runs once per database, and is recorded in
+schema_migrations. init_db applies the pending ones at startup, so existing
+deployments pick up new indexes on their next restart;
+
+    python -m backend.app.migrations            # apply pending migrations
+    python -m backend.app.migrations status     # list applied and pending ones
+
+do the same by hand. Migration 1 brings any database up to the models
+(missing tables, columns and indexes), which is how a fresh database starts
+and how one created before migrations existed catches up. Because a fresh
+database therefore already has every index declared on the models, later
+migrations must be idempotent (IF NOT EXISTS / IF EXISTS).
+
+On PostgreSQL indexes are built CONCURRENTLY, so writes continue while a large
+table is indexed, and an advisory lock keeps several starting workers from
+migrating at the same time.
+"""
+import sys
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import inspect, select, text
+
+from .db import Base, SessionLocal, engine
+from .models import ArchiveState, SchemaMigration, Transaction
+from . import archive, rollup, search
+
+
+# Arbitrary constant identifying the migration lock among PostgreSQL advisory locks
+ADVISORY_LOCK_KEY = 724_113_001
+
+
+def create_index(bind, name: str, table: str, columns: str, unique: bool = False) -> None:
+    if bind.dialect.name == "postgresql":
+        # CONCURRENTLY can't run inside a transaction
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+    else:
+        with bind.begin() as conn:
+            conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def drop_index(bind, name: str) -> None:
+    with bind.begin() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def baseline(bind) -> None:
+    """Create missing tables, then add columns and indexes declared on existing ones since"""
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+            if column.server_default is not None:
+                # Existing rows take the default, so a NOT NULL column can be added too
+                ddl += f" DEFAULT {column.server_default.arg}" + ("" if column.nullable else " NOT NULL")
+            with bind.begin() as conn:
+                conn.execute(text(ddl))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    search.ensure_search_index(bind)
+
+
+def category_indexes(bind) -> None:
+    """Index transactions by category; drop the duplicate indexes on primary keys"""
+    # Category pages and exports (category_id = ? ordered by time), and the
+    # cascade that deletes a category's transactions
+    create_index(bind, "ix_transactions_category_created_at", "transactions", "category_id, created_at, id")
+    # Primary keys are indexed already; a second index on them only slows down writes
+    for name in ("ix_transactions_id", "ix_categories_id"):
+        drop_index(bind, name)
+
+
+def _partition_postgres(bind) -> None:
+    with bind.begin() as conn:
+        if conn.scalar(text("SELECT relkind FROM pg_class WHERE relname = 'transactions'")) == "p":
+            return
+        # Search documents can't reference a partitioned table's id; a trigger deletes them instead
+        conn.execute(text("ALTER TABLE IF EXISTS transaction_search DROP CONSTRAINT IF EXISTS transaction_search_transaction_id_fkey"))
+        conn.execute(text("UPDATE transactions SET created_at = coalesce(updated_at, timezone('utc', now())) WHERE created_at IS NULL"))
+        conn.execute(text("ALTER TABLE transactions RENAME TO transactions_unpartitioned"))
+        conn.execute(text("ALTER TABLE transactions_unpartitioned DROP CONSTRAINT transactions_pkey"))
+        for (index,) in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'transactions_unpartitioned'")).all():
+            conn.execute(text(f"DROP INDEX {index}"))
+        since = conn.scalar(text("SELECT min(created_at) FROM transactions_unpartitioned")) or datetime.utcnow()
+        archive.partition_tables(conn, since)
+        columns = ", ".join(archive.COLUMNS)
+        conn.execute(text(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM transactions_unpartitioned"))
+        conn.execute(text("DROP TABLE transactions_unpartitioned"))
+
+
+def _rebuild_sqlite(bind) -> None:
+    with bind.begin() as conn:
+        ddl = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"))
+        if "AUTOINCREMENT" not in ddl.upper():
+            # The search triggers would follow the rename; ensure_search_index recreates them
+            for trigger in ("insert", "update", "delete", "category_rename"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS transaction_search_{trigger}"))
+            conn.execute(text("UPDATE transactions SET created_at = coalesce(updated_at, :now) WHERE created_at IS NULL"), {"now": datetime.utcnow()})
+            conn.execute(text("ALTER TABLE transactions RENAME TO transactions_old"))
+            for (index,) in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions_old' AND sql IS NOT NULL"
+            )).all():
+                conn.execute(text(f"DROP INDEX {index}"))
+            Transaction.__table__.create(bind=conn)
+            columns = ", ".join(archive.COLUMNS)
+            conn.execute(text(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM transactions_old"))
+            conn.execute(text("DROP TABLE transactions_old"))
+        archive.transactions_archive.create(bind=conn, checkfirst=True)
+
+
+def partition_transactions(bind) -> None:
+    """Partition transactions by month (PostgreSQL) and add the archive of cold history (see archive.py).
+
+    Rewrites the transactions table once, so it takes a while on a large database.
+    On SQLite the rebuilt table gets AUTOINCREMENT, so archived ids are not reused.
+    """
+    if bind.dialect.name == "postgresql":
+        _partition_postgres(bind)
+    else:
+        _rebuild_sqlite(bind)
+    ArchiveState.__table__.create(bind=bind, checkfirst=True)
+    search.ensure_search_index(bind)
+
+
+# (version, name, migrate(bind)); append only, never renumber
+MIGRATIONS: list[tuple[int, str, Callable]] = [
+    (1, "baseline", baseline),
+    (2, "category_indexes", category_indexes),
+    (3, "partition_transactions", partition_transactions),
+]
+
+
+def applied_versions(bind) -> set[int]:
+    SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+    with bind.connect() as conn:
+        return set(conn.scalars(select(SchemaMigration.version)))
+
+
+def upgrade(bind=engine) -> list[int]:
+    """Apply pending migrations in order; returns the versions applied"""
+    with bind.connect() as lock:
+        if bind.dialect.name == "postgresql":
+            lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            lock.commit()
+        try:
+            done = applied_versions(bind)
+            applied = []
+            for version, name, migrate in MIGRATIONS:
+                if version in done:
+                    continue
+                migrate(bind)
+                with bind.begin() as conn:
+                    conn.execute(SchemaMigration.__table__.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+                print(f"✅ Applied migration {version}: {name}")
+                applied.append(version)
+            return applied
+        finally:
+            if bind.dialect.name == "postgresql":
+                lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                lock.commit()
+
+
+def migrate_db() -> None:
+    """Bring the schema up to date, add upcoming partitions and fill the rollup if it is new (run at startup)"""
+    upgrade(engine)
+    archive.ensure_partitions(engine)
+    with SessionLocal() as db:
+        rollup.ensure_populated(db)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["status"]:
+        done = applied_versions(engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"{'applied' if version in done else 'pending'}  {version:>4}  {name}")
+    elif sys.argv[1:]:
+        sys.exit("usage: python -m backend.app.migrations [status]")
+    else:
+        migrate_db()
+        print("✅ Schema is up to date")
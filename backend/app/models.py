@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Numeric, Boolean, Column
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Numeric, Boolean, Column, Index
 from sqlalchemy.orm import relationship
 
 from .db import Base
@@ -23,30 +23,139 @@ class User(Base):
 class Category(Base):
     __tablename__ = "categories"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(100), index=True)
     type = Column(String(10), index=True)  # income | expense
+    # Also orders a user's categories by id (the rowid / primary key follows in the index)
     user_id = Column(ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # User data version of the last write to this row (see /sync)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     user = relationship("User", back_populates="categories")
     transactions = relationship("Transaction", back_populates="category", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Category names are unique per user; also the conflict target for default provisioning
+        Index("uq_categories_user_name", "user_id", "name", unique=True),
+        Index("ix_categories_user_version", "user_id", "version"),
+    )
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     amount = Column(Numeric(12, 2))
     note = Column(String(255), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Partition key on PostgreSQL (see archive.py)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # User data version of the last write to this row (see /sync)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     category_id = Column(ForeignKey("categories.id"))
+    # Also orders a user's transactions by id for full /sync snapshots
     user_id = Column(ForeignKey("users.id"), index=True)
 
     # Relationships
     category = relationship("Category", back_populates="transactions")
     user = relationship("User", back_populates="transactions")
 
+    __table_args__ = (
+        # Serves the per-user history pages: equality on user_id, range/sort on (created_at, id)
+        Index("ix_transactions_user_created_at", "user_id", "created_at", "id"),
+        # Category pages and exports, and deleting a category's transactions
+        Index("ix_transactions_category_created_at", "category_id", "created_at", "id"),
+        Index("ix_transactions_user_version", "user_id", "version"),
+        # Ids of archived transactions are never handed out again
+        {"sqlite_autoincrement": True},
+    )
+
+
+class TransactionRollup(Base):
+    """Per-user, per-category sums of transactions for each UTC hour.
+
+    Kept in step with the transactions table by the write routes (see rollup.py)
+    so balances and reports don't have to aggregate the raw history.
+    """
+    __tablename__ = "transaction_rollups"
+
+    user_id = Column(ForeignKey("users.id"), primary_key=True)
+    category_id = Column(ForeignKey("categories.id"), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # start of the UTC hour
+    amount_sum = Column(Numeric(16, 2), nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_transaction_rollups_user_bucket", "user_id", "bucket"),
+    )
+
+
+class UserDataVersion(Base):
+    """Per-user counter bumped by every write to the user's categories or transactions.
+
+    Read endpoints derive their ETag from it, so polling clients get a 304
+    without the underlying queries being run.
+    """
+    __tablename__ = "user_data_versions"
+
+    user_id = Column(ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    """A deleted category or transaction, kept so /sync can tell clients to drop it"""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(ForeignKey("users.id"), nullable=False)
+    entity = Column(String(20), nullable=False)  # category | transaction
+    entity_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_tombstones_user_version", "user_id", "version"),
+    )
+
+
+class Job(Base):
+    """A background export or report run by the local job pool; the result file is kept until expires_at"""
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, also the result file name
+    user_id = Column(ForeignKey("users.id"), nullable=False)
+    kind = Column(String(20), nullable=False)  # export_csv | export_parquet | export_arrow | report_range
+    params_key = Column(String(64), nullable=False)  # hash of kind + request parameters
+    data_version = Column(Integer, nullable=False)  # user's data version the result was requested at
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | done | failed
+    error = Column(String(500))
+    size = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_jobs_user_key_version", "user_id", "params_key", "data_version"),
+        Index("ix_jobs_expires_at", "expires_at"),
+    )
+
+
+class SchemaMigration(Base):
+    """A migration from migrations.py that has been applied to this database"""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ArchiveState(Base):
+    """Single row (id 1) holding the archive watermark; see archive.py"""
+    __tablename__ = "archive_state"
 
+    id = Column(Integer, primary_key=True)
+    archived_before = Column(DateTime, nullable=False)  # transactions before it may be in transactions_archive
@@ -0,0 +1,171 @@
+"""Default category provisioning and bulk tenant seeding.
+
+Categories are created with one set-based INSERT ... ON CONFLICT DO NOTHING,
+backed by the unique (user_id, name) index, so provisioning is idempotent and
+costs a single round trip per batch of users.
+
+For migrations and load-test setup:
+
+    # give every existing user the default categories they are missing
+    python -m backend.app.provision categories
+
+    # create loadtest+0@example.com ... loadtest+4999@example.com with categories
+    python -m backend.app.provision users --count 5000 --password secret
+"""
+import argparse
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal, dialect_insert
+from .models import Category, User
+from . import versions
+
+
+DEFAULT_CATEGORIES: list[tuple[str, str]] = [
+    # Income (5)
+    ("Salary", "income"),
+    ("Business", "income"),
+    ("Dividends", "income"),
+    ("Gifts", "income"),
+    ("Other income", "income"),
+    # Expenses from provided list
+    ("Food", "expense"),
+    ("Eating Out", "expense"),
+    ("Clothes", "expense"),
+    ("Sport", "expense"),
+    ("Car", "expense"),
+    ("Household", "expense"),
+    ("Relaxation", "expense"),
+    ("Mobile", "expense"),
+    ("Internet", "expense"),
+    ("Insurance", "expense"),
+    ("Finance", "expense"),
+    ("DM", "expense"),
+    ("Home", "expense"),
+    ("Personal care", "expense"),
+    ("Electronics", "expense"),
+    ("Travel", "expense"),
+    ("Sharing", "expense"),
+    ("Charity", "expense"),
+    ("Medication", "expense"),
+    ("Education", "expense"),
+    ("Investing", "expense"),
+    ("Pets", "expense"),
+    ("Hobbys", "expense"),
+    ("Other", "expense"),
+    ("Children", "expense"),
+    ("Presents", "expense"),
+]
+
+
+def _insert_default_categories(db: Session, versions: dict[int, int]) -> None:
+    """Insert the default categories each user doesn't have yet, stamped with that user's data version"""
+    now = datetime.utcnow()
+    rows = [
+        {"name": name, "type": type_, "user_id": user_id, "created_at": now, "updated_at": now, "version": version}
+        for user_id, version in versions.items()
+        for name, type_ in DEFAULT_CATEGORIES
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(db.get_bind())(Category).on_conflict_do_nothing(
+        index_elements=[Category.user_id, Category.name],
+    )
+    db.execute(stmt, rows)
+
+
+def create_default_categories(db: Session, user_ids: Iterable[int], version: int) -> None:
+    """Insert the default categories each user doesn't have yet, at the data version the caller bumped to (no commit)"""
+    _insert_default_categories(db, dict.fromkeys(user_ids, version))
+
+
+def backfill_default_categories(db: Session, user_ids: list[int]) -> list[int]:
+    """Insert the missing default categories of many users (no commit); returns the users that got any.
+
+    Each of them gets a new data version, stamped on their new categories, so
+    /sync clients receive them and cached ETags stop matching.
+    """
+    complete = set(db.scalars(
+        select(Category.user_id)
+        .where(Category.user_id.in_(user_ids), Category.name.in_([name for name, _ in DEFAULT_CATEGORIES]))
+        .group_by(Category.user_id)
+        .having(func.count() >= len(DEFAULT_CATEGORIES))
+    ))
+    missing = [user_id for user_id in user_ids if user_id not in complete]
+    _insert_default_categories(db, versions.bump_many(db, missing))
+    return missing
+
+
+def provision_existing_users(db: Session, batch_size: int = 500) -> int:
+    """Give every user the missing default categories, one transaction per batch"""
+    user_ids = db.scalars(select(User.id).order_by(User.id)).all()
+    for i in range(0, len(user_ids), batch_size):
+        backfill_default_categories(db, user_ids[i:i + batch_size])
+        db.commit()
+    return len(user_ids)
+
+
+def provision_users(
+    db: Session,
+    count: int,
+    hashed_password: str,
+    email_template: str = "loadtest+{i}@example.com",
+    batch_size: int = 500,
+) -> list[int]:
+    """Create `count` users with default categories in batched transactions.
+
+    Existing emails are skipped; returns the ids of the users actually created.
+    """
+    insert = dialect_insert(db.get_bind())
+    created: list[int] = []
+    for start in range(0, count, batch_size):
+        now = datetime.utcnow()
+        rows = [
+            {
+                "email": email_template.format(i=i),
+                "hashed_password": hashed_password,
+                "full_name": None,
+                "is_active": True,
+                "created_at": now,
+            }
+            for i in range(start, min(start + batch_size, count))
+        ]
+        stmt = insert(User).on_conflict_do_nothing(index_elements=[User.email]).returning(User.id)
+        user_ids = [row[0] for row in db.execute(stmt, rows).all()]
+        backfill_default_categories(db, user_ids)
+        db.commit()
+        created.extend(user_ids)
+    return created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Provision default categories and seed users in bulk")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    categories = sub.add_parser("categories", help="add missing default categories for all users")
+    categories.add_argument("--batch-size", type=int, default=500)
+
+    users = sub.add_parser("users", help="create users with default categories")
+    users.add_argument("--count", type=int, required=True)
+    users.add_argument("--password", required=True)
+    users.add_argument("--email-template", default="loadtest+{i}@example.com")
+    users.add_argument("--batch-size", type=int, default=500)
+
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        if args.command == "categories":
+            total = provision_existing_users(db, args.batch_size)
+            print(f"✅ Default categories ensured for {total} users")
+        else:
+            from .auth import get_password_hash
+
+            # One hash shared by all seeded users; bcrypt per user would dominate the run
+            created = provision_users(db, args.count, get_password_hash(args.password), args.email_template, args.batch_size)
+            print(f"✅ Created {len(created)} users ({args.count - len(created)} already existed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Routing of read-only requests between the primary and an optional read replica.
+
+With DATABASE_READ_URL set, GET routes (lists, reports, balance, dashboard,
+sync, exports) read from the replica, so heavy aggregates don't compete with
+writes on the primary. Users' own changes never seem to vanish while the
+replica catches up:
+
+- every response to a write hands the client the data version it wrote
+  (X-Written-Version header and a cookie); a read that brings it back goes
+  to the replica only once the replica's user_data_versions row has reached
+  it, whichever worker serves the read;
+- a user who wrote on this worker within the last READ_YOUR_WRITES_SECONDS
+  reads from the primary without asking the replica.
+
+Clients that send neither header nor cookie only get the per-worker window.
+
+Every decision is counted in db_read_routing_total on /metrics.
+
+Two SQLite files are enough to try it locally: point DATABASE_READ_URL at a
+second file and refresh it from the primary whenever you want the replica to
+"catch up":
+
+    python -m backend.app.replica copy
+"""
+import os
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+
+from .auth import CurrentUser, get_current_user
+from .db import (
+    DATABASE_READ_URL,
+    DATABASE_URL,
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+)
+from .models import UserDataVersion
+
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Prune expired write marks once this many users are tracked
+MAX_TRACKED_WRITERS = 10000
+
+# "<user id>-<data version>" of the client's latest write, sent back with its reads
+WRITTEN_VERSION_HEADER = "X-Written-Version"
+WRITTEN_VERSION_COOKIE = "written_version"
+
+_last_write: dict[int, float] = {}  # user id -> monotonic time of their latest write
+_decisions: dict[tuple[str, str], int] = defaultdict(int)  # (target, reason) -> count
+# Per request (set by WrittenVersionMiddleware): the header value for the write it made
+_written: ContextVar[Optional[dict[str, str]]] = ContextVar("written", default=None)
+
+
+def note_write(user_id: int, version: int) -> None:
+    """Remember that the user just wrote, so their reads stay on the primary until the replica has it"""
+    now = time.monotonic()
+    if len(_last_write) >= MAX_TRACKED_WRITERS:
+        for uid, at in list(_last_write.items()):
+            if now - at > READ_YOUR_WRITES_SECONDS:
+                _last_write.pop(uid, None)
+    _last_write[user_id] = now
+    written = _written.get()
+    if written is not None:
+        written["value"] = f"{user_id}-{version}"
+
+
+class WrittenVersionMiddleware:
+    """Hands the data version a request wrote back to the client, so any worker can route its next read"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DATABASE_READ_URL:
+            await self.app(scope, receive, send)
+            return
+        written: dict[str, str] = {}
+        token = _written.set(written)
+
+        async def send_with_version(message):
+            if message["type"] == "http.response.start" and written:
+                headers = MutableHeaders(scope=message)
+                headers.append(WRITTEN_VERSION_HEADER, written["value"])
+                headers.append("Set-Cookie", f"{WRITTEN_VERSION_COOKIE}={written['value']}; Path=/; HttpOnly; SameSite=Lax")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_version)
+        finally:
+            _written.reset(token)
+
+
+def written_version(request: Request, user_id: int) -> int:
+    """Data version of the user's latest write as reported by the client (0 if unknown)"""
+    value = request.headers.get(WRITTEN_VERSION_HEADER) or request.cookies.get(WRITTEN_VERSION_COOKIE) or ""
+    owner, _, version = value.partition("-")
+    # Another account's write, e.g. after switching users in the same browser, says nothing
+    return int(version) if owner == str(user_id) and version.isdigit() else 0
+
+
+def _route(user_id: int) -> tuple[str, str]:
+    if not DATABASE_READ_URL:
+        return "primary", "no_replica"
+    if time.monotonic() - _last_write.get(user_id, float("-inf")) < READ_YOUR_WRITES_SECONDS:
+        return "primary", "read_your_writes"
+    return "replica", "replica"
+
+
+def _count(target: str, reason: str) -> bool:
+    _decisions[(target, reason)] += 1
+    return target == "replica"
+
+
+def use_replica(user_id: int) -> bool:
+    """Decide where the user's next read goes, and count the decision"""
+    return _count(*_route(user_id))
+
+
+async def _read_from_replica(request: Request, user_id: int) -> bool:
+    """use_replica, also checking that the replica has the version the client last wrote"""
+    target, reason = _route(user_id)
+    wanted = written_version(request, user_id)
+    if target == "replica" and wanted:
+        async with AsyncReadSessionLocal() as db:
+            seen = await db.scalar(select(UserDataVersion.version).where(UserDataVersion.user_id == user_id))
+        if (seen or 0) < wanted:
+            target, reason = "primary", "replica_behind"
+    return _count(target, reason)
+
+
+async def get_read_db(request: Request, current_user: CurrentUser = Depends(get_current_user)):
+    """Session for read-only routes: the replica unless it hasn't caught up with the user's writes"""
+    session_factory = AsyncReadSessionLocal if await _read_from_replica(request, current_user.id) else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+
+async def get_read_sessionmaker(request: Request, current_user: CurrentUser = Depends(get_current_user)) -> sessionmaker[Session]:
+    """Sync session factory for reads done in the threadpool (exports), routed like get_read_db"""
+    return ReadSessionLocal if await _read_from_replica(request, current_user.id) else SessionLocal
+
+
+def read_sessionmaker(user_id: int) -> sessionmaker[Session]:
+    """Sync session factory for background reads (jobs), which check the replica's version themselves"""
+    return ReadSessionLocal if use_replica(user_id) else SessionLocal
+
+
+def render() -> str:
+    """Routing counters in the Prometheus text format, appended to /metrics"""
+    lines = [
+        "# HELP db_read_routing_total Read-only requests by database used and why",
+        "# TYPE db_read_routing_total counter",
+        *(
+            f'db_read_routing_total{{target="{target}",reason="{reason}"}} {count}'
+            for (target, reason), count in sorted(_decisions.items())
+        ),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def sqlite_path(url: str) -> str:
+    return url.split("///", 1)[1]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["copy"]:
+        sys.exit("usage: python -m backend.app.replica copy")
+    if not (DATABASE_URL.startswith("sqlite") and DATABASE_READ_URL.startswith("sqlite")):
+        sys.exit("copy needs SQLite DATABASE_URL and DATABASE_READ_URL; use real replication for PostgreSQL")
+    source, target = sqlite3.connect(sqlite_path(DATABASE_URL)), sqlite3.connect(sqlite_path(DATABASE_READ_URL))
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+    print(f"✅ Copied {sqlite_path(DATABASE_URL)} to {sqlite_path(DATABASE_READ_URL)}")
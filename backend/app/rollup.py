@@ -0,0 +1,324 @@
+"""Hourly rollup of transaction amounts per user and category.
+
+Write routes call `add_transactions` / `remove_transactions` in the same DB
+transaction as the change itself; balance and report queries read the rollup
+instead of summing the raw history.
+
+Rebuild or verify it from the raw transactions with:
+
+    python -m backend.app.rollup rebuild [--user-id N]
+    python -m backend.app.rollup check [--user-id N]
+"""
+import argparse
+import sys
+from bisect import bisect_right
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal, dialect_insert
+from .models import Category, Transaction, TransactionRollup, User
+from . import archive
+
+
+def hour_bucket(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def is_hour_aligned(dt: datetime) -> bool:
+    return dt == hour_bucket(dt)
+
+
+def _apply(db: Session, rows: Iterable[tuple[int, int, datetime, object]], sign: int) -> None:
+    deltas: dict[tuple[int, int, datetime], list] = {}
+    for user_id, category_id, created_at, amount in rows:
+        # Legacy transactions without an owner or a category are not rolled up
+        if user_id is None or category_id is None:
+            continue
+        key = (user_id, category_id, hour_bucket(created_at))
+        delta = deltas.setdefault(key, [Decimal(0), 0])
+        delta[0] += Decimal(str(amount)) * sign
+        delta[1] += sign
+    if not deltas:
+        return
+
+    params = [
+        {"user_id": u, "category_id": c, "bucket": b, "amount_sum": amount, "txn_count": count}
+        for (u, c, b), (amount, count) in deltas.items()
+    ]
+    stmt = dialect_insert(db.get_bind())(TransactionRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TransactionRollup.user_id, TransactionRollup.category_id, TransactionRollup.bucket],
+        set_={
+            "amount_sum": TransactionRollup.amount_sum + stmt.excluded.amount_sum,
+            "txn_count": TransactionRollup.txn_count + stmt.excluded.txn_count,
+        },
+    )
+    db.execute(stmt, params)
+
+    if sign < 0:
+        # Drop buckets that no longer hold any transaction
+        for user_id, category_id, bucket in deltas:
+            db.execute(delete(TransactionRollup).where(
+                TransactionRollup.user_id == user_id,
+                TransactionRollup.category_id == category_id,
+                TransactionRollup.bucket == bucket,
+                TransactionRollup.txn_count <= 0,
+            ))
+
+
+def add_transactions(db: Session, transactions: Iterable[Transaction]) -> None:
+    """Add transactions to the rollup (call before committing them)"""
+    _apply(db, ((t.user_id, t.category_id, t.created_at, t.amount) for t in transactions), 1)
+
+
+def add_rows(db: Session, rows: Iterable[dict]) -> None:
+    """Add plain row dicts (as passed to a bulk insert) to the rollup"""
+    _apply(db, ((r["user_id"], r["category_id"], r["created_at"], r["amount"]) for r in rows), 1)
+
+
+def remove_transactions(db: Session, transactions: Iterable[Transaction]) -> None:
+    """Subtract transactions from the rollup (call with their old values, before committing)"""
+    _apply(db, ((t.user_id, t.category_id, t.created_at, t.amount) for t in transactions), -1)
+
+
+def remove_category(db: Session, user_id: int, category_id: int) -> None:
+    """Drop all rollup rows of a category that is being deleted together with its transactions"""
+    db.execute(delete(TransactionRollup).where(
+        TransactionRollup.user_id == user_id,
+        TransactionRollup.category_id == category_id,
+    ))
+
+
+def _sum_if(condition, value):
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def balance_totals(db: Session, user_id: int) -> tuple[float, float]:
+    """All-time (income, expense) totals of a user in one conditional-aggregation scan of the rollup"""
+    income, expense = db.execute(
+        select(
+            _sum_if(Category.type == "income", TransactionRollup.amount_sum),
+            _sum_if(Category.type == "expense", TransactionRollup.amount_sum),
+        )
+        .join(Category, Category.id == TransactionRollup.category_id)
+        .where(TransactionRollup.user_id == user_id)
+    ).one()
+    return float(income), float(expense)
+
+
+def category_overview(db: Session, user_id: int, start: datetime, end: datetime):
+    """Every category of a user with its all-time total and its total in [start, end).
+
+    One pass over the user's categories left-joined to the rollup; rows are
+    (id, name, type, all_time_total, range_total, range_count), ordered by name.
+    The range columns are only meaningful when start and end are hour-aligned.
+    """
+    in_range = and_(TransactionRollup.bucket >= start, TransactionRollup.bucket < end)
+    return db.execute(
+        select(
+            Category.id,
+            Category.name,
+            Category.type,
+            func.coalesce(func.sum(TransactionRollup.amount_sum), 0),
+            _sum_if(in_range, TransactionRollup.amount_sum),
+            _sum_if(in_range, TransactionRollup.txn_count),
+        )
+        .select_from(Category)
+        .outerjoin(TransactionRollup, and_(
+            TransactionRollup.category_id == Category.id,
+            TransactionRollup.user_id == Category.user_id,
+        ))
+        .where(Category.user_id == user_id)
+        .group_by(Category.id)
+        .order_by(Category.name)
+    ).all()
+
+
+def category_totals(
+    db: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    type: Optional[str] = None,
+) -> list[tuple[str, str, float]]:
+    """(category, type, total) for transactions in the UTC range [start, end), largest first.
+
+    Hour-aligned ranges are answered from the rollup. Zones with a sub-hour
+    offset (e.g. Asia/Kolkata) produce unaligned bounds; those fall back to the
+    raw transactions, which for a single period is an index range scan.
+    """
+    if is_hour_aligned(start) and is_hour_aligned(end):
+        total = func.sum(TransactionRollup.amount_sum)
+        stmt = (
+            select(Category.name, Category.type, total)
+            .join(Category, Category.id == TransactionRollup.category_id)
+            .where(
+                TransactionRollup.user_id == user_id,
+                TransactionRollup.bucket >= start,
+                TransactionRollup.bucket < end,
+            )
+        )
+    else:
+        t = archive.source(archive.archived_before(db), start)
+        total = func.sum(t.amount)
+        stmt = (
+            select(Category.name, Category.type, total)
+            .join(Category, Category.id == t.category_id)
+            .where(
+                t.user_id == user_id,
+                t.created_at >= start,
+                t.created_at < end,
+            )
+        )
+    stmt = stmt.group_by(Category.id).order_by(total.desc())
+    if type in {"income", "expense"}:
+        stmt = stmt.where(Category.type == type)
+    return [(name, type_, float(total)) for name, type_, total in db.execute(stmt).all()]
+
+
+def bucketed_totals(
+    db: Session,
+    user_id: int,
+    boundaries: list[datetime],
+    type: Optional[str] = None,
+) -> list[tuple[int, str, str, float]]:
+    """Totals per (bucket, category) for consecutive UTC buckets [boundaries[i], boundaries[i + 1]).
+
+    One range query feeds a single bisect pass in Python, so DST-shifted
+    boundaries computed by the caller are honoured exactly. As with
+    category_totals, the rollup is read when every boundary is hour-aligned and
+    the raw transactions otherwise. Returns (bucket_index, category, type, total)
+    ordered by bucket, then total desc.
+    """
+    if all(is_hour_aligned(b) for b in boundaries):
+        at, amount = TransactionRollup.bucket, TransactionRollup.amount_sum
+        stmt = (
+            select(at, Category.id, Category.name, Category.type, amount)
+            .join(Category, Category.id == TransactionRollup.category_id)
+            .where(TransactionRollup.user_id == user_id)
+        )
+    else:
+        t = archive.source(archive.archived_before(db), boundaries[0])
+        at, amount = t.created_at, t.amount
+        stmt = (
+            select(at, Category.id, Category.name, Category.type, amount)
+            .join(Category, Category.id == t.category_id)
+            .where(t.user_id == user_id)
+        )
+    stmt = stmt.where(at >= boundaries[0], at < boundaries[-1])
+    if type in {"income", "expense"}:
+        stmt = stmt.where(Category.type == type)
+
+    totals: dict[tuple[int, int], list] = {}
+    for ts, category_id, name, type_, value in db.execute(stmt.execution_options(yield_per=5000)):
+        idx = bisect_right(boundaries, ts) - 1
+        entry = totals.setdefault((idx, category_id), [name, type_, Decimal(0)])
+        entry[2] += Decimal(str(value))
+    rows = [(idx, name, type_, float(total)) for (idx, _), (name, type_, total) in totals.items()]
+    rows.sort(key=lambda row: (row[0], -row[3]))
+    return rows
+
+
+def _hour_expr(db: Session, created_at):
+    """SQL expression truncating a transaction's created_at to the rollup bucket format"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("hour", created_at)
+    # Same text layout SQLAlchemy uses for DateTime on SQLite, so buckets compare equal
+    return func.strftime("%Y-%m-%d %H:00:00.000000", created_at)
+
+
+def _raw_aggregate(db: Session, user_id: Optional[int] = None):
+    # Archived transactions stay in the rollup, so they count here as well
+    t = archive.source(archive.archived_before(db))
+    bucket = _hour_expr(db, t.created_at)
+    stmt = (
+        select(
+            t.user_id,
+            t.category_id,
+            bucket.label("bucket"),
+            func.sum(t.amount),
+            func.count(),
+        )
+        .where(t.user_id.is_not(None), t.category_id.is_not(None))
+        .group_by(t.user_id, t.category_id, bucket)
+    )
+    if user_id is not None:
+        stmt = stmt.where(t.user_id == user_id)
+    return stmt
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> None:
+    """Recompute the rollup from the raw transactions (all users or one)"""
+    wipe = delete(TransactionRollup)
+    if user_id is not None:
+        wipe = wipe.where(TransactionRollup.user_id == user_id)
+    db.execute(wipe)
+    db.execute(
+        insert(TransactionRollup).from_select(
+            ["user_id", "category_id", "bucket", "amount_sum", "txn_count"],
+            _raw_aggregate(db, user_id),
+        )
+    )
+
+
+def check(db: Session, user_id: Optional[int] = None) -> list[str]:
+    """Compare the rollup with the raw transactions, user by user; returns a list of mismatches"""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = db.scalars(select(User.id).order_by(User.id)).all()
+
+    problems = []
+    for uid in user_ids:
+        raw = {}
+        for _, category_id, bucket, amount, count in db.execute(_raw_aggregate(db, uid)):
+            if isinstance(bucket, str):
+                bucket = datetime.fromisoformat(bucket)
+            raw[(category_id, bucket)] = (Decimal(str(amount)), count)
+        stored = {
+            (r.category_id, r.bucket): (Decimal(str(r.amount_sum)), r.txn_count)
+            for r in db.scalars(select(TransactionRollup).where(TransactionRollup.user_id == uid))
+        }
+        for key in raw.keys() | stored.keys():
+            expected, actual = raw.get(key), stored.get(key)
+            if expected is None or actual is None or expected[1] != actual[1] or abs(expected[0] - actual[0]) >= Decimal("0.01"):
+                problems.append(f"user {uid} category {key[0]} hour {key[1]}: expected {expected}, found {actual}")
+    return problems
+
+
+def ensure_populated(db: Session) -> None:
+    """Build the rollup once for databases that had transactions before it existed"""
+    has_rollup = db.scalar(select(TransactionRollup.user_id).limit(1)) is not None
+    has_transactions = db.scalar(select(Transaction.id).limit(1)) is not None
+    if has_transactions and not has_rollup:
+        rebuild(db)
+        db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the transaction rollup table")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            rebuild(db, args.user_id)
+            db.commit()
+            print("✅ Rollup rebuilt")
+        problems = check(db, args.user_id)
+
+    if problems:
+        print(f"❌ {len(problems)} rollup mismatches:")
+        for problem in problems[:50]:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("✅ Rollup matches the raw transactions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,127 +1,363 @@
-from datetime import datetime
-from calendar import monthrange
-from io import StringIO
+import base64
+from datetime import date, datetime, timedelta
+from typing import Literal
+import orjson
 import pytz
 
-import pandas as pd
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import Float, cast, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
-from .db import get_db, Base, engine
-from .models import Category, Transaction
+from .db import get_async_db, SessionLocal
+from .replica import get_read_db, get_read_sessionmaker
+from .models import Category, Job, Transaction
 from .schemas import (
     CategorySchema,
     CategoryCreate,
     TransactionSchema,
     TransactionCreate,
     TransactionUpdate,
-    Balance
+    Balance,
+    CategoryTotal,
+    Dashboard,
+    ImportResult,
+    JobSchema,
+    SyncChanges,
 )
-from .auth import get_current_user
-from .models import User
+from .auth import CurrentUser, get_current_user
+from .exports import iter_arrow, iter_csv
+from .ingest import import_csv_file, import_rows
+from .encoding import negotiated
+from . import archive, jobs, migrations, rollup, search, sync, versions
 
 
 router = APIRouter()
 
 
 def init_db():
-    """Initialize the database - no default categories needed since they're created per user."""
-    # Database is initialized with proper schema, no default data needed
-    pass
+    """Apply pending schema migrations (see migrations.py)"""
+    migrations.migrate_db()
+
+
+def local_now(timezone: str) -> datetime:
+    """Current naive local time in the given timezone (UTC if unknown)"""
+    try:
+        tz = pytz.timezone(timezone)
+    except pytz.exceptions.UnknownTimeZoneError:
+        tz = pytz.UTC
+    return datetime.now(tz).replace(tzinfo=None)
+
+
+def month_range(year: int, month: int) -> tuple[datetime, datetime]:
+    """Local [first day of month, first day of next month)"""
+    return datetime(year, month, 1), datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+
+
+# Upper bound on buckets per /report/range call (a bit over 5 years of days)
+MAX_REPORT_BUCKETS = 2000
+
+
+def bucket_starts(date_from: date, date_to: date, bucket: str) -> list[datetime]:
+    """Local bucket boundaries covering [date_from, date_to), widened to whole buckets"""
+    if bucket == "week":
+        current = date_from - timedelta(days=date_from.weekday())  # ISO weeks start on Monday
+    elif bucket == "month":
+        current = date_from.replace(day=1)
+    else:
+        current = date_from
+
+    starts = [current]
+    while current < date_to:
+        if bucket == "day":
+            current += timedelta(days=1)
+        elif bucket == "week":
+            current += timedelta(weeks=1)
+        else:
+            current = date(current.year + 1, 1, 1) if current.month == 12 else date(current.year, current.month + 1, 1)
+        starts.append(current)
+        if len(starts) > MAX_REPORT_BUCKETS + 1:
+            raise HTTPException(status_code=400, detail="Range too large for this bucket size")
+    return [datetime(d.year, d.month, d.day) for d in starts]
+
+
+def local_range_to_utc(timezone: str, local_start: datetime, local_end: datetime) -> tuple[datetime, datetime]:
+    """Convert a local [start, end) range to naive UTC; unknown timezones are treated as UTC"""
+    try:
+        tz = pytz.timezone(timezone)
+    except pytz.exceptions.UnknownTimeZoneError:
+        return local_start, local_end
+    start = tz.localize(local_start).astimezone(pytz.UTC).replace(tzinfo=None)
+    end = tz.localize(local_end).astimezone(pytz.UTC).replace(tzinfo=None)
+    return start, end
+
+
+# The list endpoints select these columns as plain tuples and serialize them with
+# orjson in one pass, instead of hydrating ORM objects and validating each one
+# through CategorySchema / TransactionSchema (which still document the responses)
+CATEGORY_COLUMNS = (Category.id, Category.name, Category.type, Category.user_id)
+
+
+def transaction_columns(t=Transaction) -> tuple:
+    """TRANSACTION_COLUMNS of Transaction or of an archive.source alias of it"""
+    return (
+        t.id,
+        cast(t.amount, Float).label("amount"),
+        t.note,
+        t.created_at,
+        t.category_id,
+        t.user_id,
+    )
+
+
+TRANSACTION_COLUMNS = transaction_columns()
+
+
+def encode_rows(request: Request, columns, rows, response: Response) -> Response:
+    """Array of objects keyed by column name (JSON or MessagePack), keeping headers set on `response`"""
+    keys = [column.key for column in columns]
+    return negotiated(request, [dict(zip(keys, row)) for row in rows], response)
 
 
 @router.post("/categories", response_model=CategorySchema)
-def create_category(payload: CategoryCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_category(payload: CategoryCreate, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Create a new category for the current user"""
-    existing = db.scalar(select(Category).where(Category.name == payload.name, Category.user_id == current_user.id))
+    existing = await db.scalar(select(Category).where(Category.name == payload.name, Category.user_id == current_user.id))
     if existing:
         raise HTTPException(status_code=409, detail="Category already exists")
-    category = Category(name=payload.name, type=payload.type, user_id=current_user.id)
+    version = await db.run_sync(versions.bump, current_user.id)
+    category = Category(name=payload.name, type=payload.type, user_id=current_user.id, version=version)
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     return category
 
 
 @router.get("/categories", response_model=list[CategorySchema])
-def list_categories(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_categories(request: Request, response: Response, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
     """Get categories for the current user"""
-    return db.scalars(select(Category).where(Category.user_id == current_user.id).order_by(Category.name)).all()
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    rows = (await db.execute(select(*CATEGORY_COLUMNS).where(Category.user_id == current_user.id).order_by(Category.name))).all()
+    return encode_rows(request, CATEGORY_COLUMNS, rows, response)
 
 
 @router.put("/categories/{category_id}", response_model=CategorySchema)
-def update_category(category_id: int, payload: CategoryCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_category(category_id: int, payload: CategoryCreate, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Update a category for the current user"""
-    category = db.scalar(select(Category).where(Category.id == category_id, Category.user_id == current_user.id))
+    category = await db.scalar(select(Category).where(Category.id == category_id, Category.user_id == current_user.id))
     if not category:
         raise HTTPException(status_code=404, detail="Not found")
     
     # Check if another category with the same name exists (excluding current category)
-    existing = db.scalar(select(Category).where(Category.name == payload.name, Category.id != category_id, Category.user_id == current_user.id))
+    existing = await db.scalar(select(Category).where(Category.name == payload.name, Category.id != category_id, Category.user_id == current_user.id))
     if existing:
         raise HTTPException(status_code=409, detail="Category with this name already exists")
     
+    category.version = await db.run_sync(versions.bump, current_user.id)
     category.name = payload.name
     category.type = payload.type
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     return category
 
 
 @router.delete("/categories/{category_id}")
-def delete_category(category_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_category(category_id: int, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Delete a category for the current user"""
-    category = db.scalar(select(Category).where(Category.id == category_id, Category.user_id == current_user.id))
+    category = await db.scalar(select(Category).where(Category.id == category_id, Category.user_id == current_user.id))
     if not category:
         raise HTTPException(status_code=404, detail="Not found")
-    db.delete(category)
-    db.commit()
+    version = await db.run_sync(versions.bump, current_user.id)
+    # The category's transactions go with it (ORM cascade), so drop its rollup rows and tombstone them as well
+    await db.run_sync(sync.record_category_delete, current_user.id, version, category_id)
+    await db.run_sync(rollup.remove_category, current_user.id, category_id)
+    await db.run_sync(archive.delete_category, current_user.id, category_id)
+    await db.delete(category)
+    await db.commit()
     return {"ok": True}
 
 
 @router.post("/transactions", response_model=TransactionSchema)
-def create_transaction(payload: TransactionCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_transaction(payload: TransactionCreate, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Create a new transaction for the current user"""
     # Verify the category belongs to the current user
-    category = db.scalar(select(Category).where(Category.id == payload.category_id, Category.user_id == current_user.id))
+    category = await db.scalar(select(Category).where(Category.id == payload.category_id, Category.user_id == current_user.id))
     if not category:
         raise HTTPException(status_code=400, detail="Invalid category")
     
     created_at = payload.created_at or datetime.utcnow()
+    version = await db.run_sync(versions.bump, current_user.id)
     t = Transaction(
         amount=payload.amount,
         note=payload.note,
         created_at=created_at,
         category_id=payload.category_id,
-        user_id=current_user.id
+        user_id=current_user.id,
+        version=version,
     )
     db.add(t)
-    db.commit()
-    db.refresh(t)
+    await db.run_sync(rollup.add_transactions, [t])
+    await db.commit()
+    await db.refresh(t)
     return t
 
 
+# Rows accepted by one POST /transactions/bulk request; larger imports should use /import/csv
+MAX_BULK_ROWS = 10000
+
+
+def _import_rows(user_id: int, payload: list) -> ImportResult:
+    with SessionLocal() as db:
+        return import_rows(db, user_id, payload)
+
+
+def _import_csv_file(user_id: int, file) -> ImportResult:
+    with SessionLocal() as db:
+        return import_csv_file(db, user_id, file)
+
+
+# Imports validate and parse row by row, which is CPU-bound, so they run on the
+# threadpool with a sync session instead of holding up the event loop
+@router.post("/transactions/bulk", response_model=ImportResult)
+async def bulk_create_transactions(payload: list = Body(...), current_user: CurrentUser = Depends(get_current_user)):
+    """Create many transactions at once; invalid rows are skipped and reported by index"""
+    if len(payload) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} rows per request")
+    return await run_in_threadpool(_import_rows, current_user.id, payload)
+
+
+@router.post("/import/csv", response_model=ImportResult)
+async def import_csv(file: UploadFile = File(...), current_user: CurrentUser = Depends(get_current_user)):
+    """Import transactions from a CSV upload (same columns as /export/csv, or category_id)"""
+    return await run_in_threadpool(_import_csv_file, current_user.id, file.file)
+
+
+def encode_cursor(t) -> str:
+    """Opaque keyset cursor pointing just after the given transaction"""
+    raw = f"{t.created_at.isoformat()}|{t.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(id_)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/transactions", response_model=list[TransactionSchema])
-def list_transactions(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get transactions for the current user"""
-    return db.scalars(select(Transaction).where(Transaction.user_id == current_user.id).order_by(Transaction.created_at.desc())).all()
+async def list_transactions(
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    type: str | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get transactions for the current user, newest first.
+
+    When `limit` is given only one page is returned; if more rows follow, the
+    `X-Next-Cursor` response header holds the `cursor` for the next page.
+    """
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    t = archive.source(await db.run_sync(archive.archived_before), date_from)
+    columns = transaction_columns(t)
+    stmt = select(*columns).where(t.user_id == current_user.id)
+    if date_from is not None:
+        stmt = stmt.where(t.created_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(t.created_at < date_to)
+    if category_id is not None:
+        stmt = stmt.where(t.category_id == category_id)
+    if type in {"income", "expense"}:
+        # Filter by category ids instead of joining so the page stays a range scan on transactions
+        stmt = stmt.where(t.category_id.in_(
+            select(Category.id).where(Category.user_id == current_user.id, Category.type == type)
+        ))
+    if cursor:
+        created_at, id_ = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(t.created_at, t.id) < tuple_(created_at, id_))
+    stmt = stmt.order_by(t.created_at.desc(), t.id.desc())
+
+    if limit is None:
+        return encode_rows(request, columns, (await db.execute(stmt)).all(), response)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    return encode_rows(request, columns, rows, response)
+
+
+@router.get("/transactions/search", response_model=list[TransactionSchema])
+async def search_transactions(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search the current user's transactions by note and category name, best matches first.
+
+    Every word of `q` must match the start of a word in the note or the
+    category name. If more results follow, the `X-Next-Offset` response header
+    holds the `offset` for the next page.
+    """
+    terms = search.query_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    stmt, params = search.search_statement(db.get_bind().dialect.name, current_user.id, terms, limit + 1, offset)
+    rows = (await db.execute(stmt, params)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return encode_rows(request, TRANSACTION_COLUMNS, rows, response)
+
+
+async def _own_transaction(db: AsyncSession, user_id: int, transaction_id: int) -> Transaction | None:
+    """The user's transaction, moved back from the archive if it was archived"""
+    stmt = select(Transaction).where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+    t = await db.scalar(stmt)
+    if t is None and await db.run_sync(archive.restore, user_id, transaction_id):
+        t = await db.scalar(stmt)
+    return t
 
 
 @router.put("/transactions/{transaction_id}", response_model=TransactionSchema)
-def update_transaction(transaction_id: int, payload: TransactionCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_transaction(transaction_id: int, payload: TransactionCreate, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Update a transaction for the current user"""
-    t = db.scalar(select(Transaction).where(Transaction.id == transaction_id, Transaction.user_id == current_user.id))
+    t = await _own_transaction(db, current_user.id, transaction_id)
     if not t:
         raise HTTPException(status_code=404, detail="Not found")
     
     # Validate category belongs to current user
-    category = db.scalar(select(Category).where(Category.id == payload.category_id, Category.user_id == current_user.id))
+    category = await db.scalar(select(Category).where(Category.id == payload.category_id, Category.user_id == current_user.id))
     if not category:
         raise HTTPException(status_code=400, detail="Invalid category")
     
+    version = await db.run_sync(versions.bump, current_user.id)
+    # Move the old values out of the rollup before overwriting them
+    await db.run_sync(rollup.remove_transactions, [t])
+
     # Update transaction fields
+    t.version = version
     t.amount = payload.amount
     t.note = payload.note
     t.category_id = payload.category_id
@@ -130,107 +366,312 @@ def update_transaction(transaction_id: int, payload: TransactionCreate, current_
     else:
         t.created_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(t)
+    await db.run_sync(rollup.add_transactions, [t])
+    await db.commit()
+    await db.refresh(t)
     return t
 
 
 @router.delete("/transactions/{transaction_id}")
-def delete_transaction(transaction_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_transaction(transaction_id: int, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Delete a transaction for the current user"""
-    t = db.scalar(select(Transaction).where(Transaction.id == transaction_id, Transaction.user_id == current_user.id))
+    t = await _own_transaction(db, current_user.id, transaction_id)
     if not t:
         raise HTTPException(status_code=404, detail="Not found")
-    db.delete(t)
-    db.commit()
+    version = await db.run_sync(versions.bump, current_user.id)
+    await db.run_sync(sync.record_transaction_deletes, current_user.id, version, [t.id])
+    await db.run_sync(rollup.remove_transactions, [t])
+    await db.delete(t)
+    await db.commit()
     return {"ok": True}
 
 
+@router.get("/sync", response_model=SyncChanges)
+async def sync_changes(
+    request: Request,
+    response: Response,
+    since: int | None = Query(None, ge=0),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Categories and transactions changed since the `cursor` of an earlier call.
+
+    Without `since` (or with a cursor this server never issued) the response is
+    a full snapshot (`full: true`). Otherwise it holds the rows created or
+    updated after the cursor and the ids deleted since then; pass its `cursor`
+    as `since` next time.
+    """
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    return negotiated(request, await db.run_sync(sync.changes, current_user.id, since), response)
+
+
 @router.get("/balance", response_model=Balance)
-def get_balance(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_balance(request: Request, response: Response, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
     """Get balance for the current user"""
-    income = db.scalar(select(func.coalesce(func.sum(Transaction.amount), 0)).join(Category).where(Category.type == "income", Transaction.user_id == current_user.id)) or 0
-    expense = db.scalar(select(func.coalesce(func.sum(Transaction.amount), 0)).join(Category).where(Category.type == "expense", Transaction.user_id == current_user.id)) or 0
-    return Balance(income=float(income), expense=float(expense), net=float(income) - float(expense))
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    income, expense = await db.run_sync(rollup.balance_totals, current_user.id)
+    return negotiated(request, {"income": income, "expense": expense, "net": income - expense}, response)
 
 
 @router.get("/report/month")
-def report_month(year: int, month: int, type: str | None = None, timezone: str = "UTC", current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def report_month(request: Request, response: Response, year: int, month: int, type: str | None = None, timezone: str = "UTC", current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
     """Get monthly report for the current user"""
-    # Convert local month to UTC for proper timezone handling
-    try:
-        tz = pytz.timezone(timezone)
-        _, last_day = monthrange(year, month)
-        local_start = datetime(year, month, 1, 0, 0, 0)
-        local_end = datetime(year, month, last_day, 23, 59, 59)
-        
-        # Convert to UTC
-        start = tz.localize(local_start).astimezone(pytz.UTC).replace(tzinfo=None)
-        end = tz.localize(local_end).astimezone(pytz.UTC).replace(tzinfo=None)
-    except pytz.exceptions.UnknownTimeZoneError:
-        # Fallback to UTC if timezone is invalid
-        start = datetime(year, month, 1)
-        end = datetime(year, month, monthrange(year, month)[1], 23, 59, 59)
-    stmt = (
-        select(Category.name, Category.type, func.sum(Transaction.amount).label("total"))
-        .join(Category)
-        .where(Transaction.created_at.between(start, end), Transaction.user_id == current_user.id)
-        .group_by(Category.id)
-        .order_by(func.sum(Transaction.amount).desc())
-    )
-    if type in {"income", "expense"}:
-        stmt = stmt.where(Category.type == type)
-    rows = db.execute(stmt).all()
-    return [
-        {"category": r[0], "type": r[1], "total": float(r[2])}
-        for r in rows
-    ]
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    # Local month [1st 00:00, 1st of next month 00:00) converted to UTC
+    start, end = local_range_to_utc(timezone, *month_range(year, month))
+    rows = await db.run_sync(rollup.category_totals, current_user.id, start, end, type)
+    return negotiated(request, [
+        {"category": name, "type": type_, "total": total}
+        for name, type_, total in rows
+    ], response)
 
 
 @router.get("/report/day")
-def report_day(year: int, month: int, day: int, type: str | None = None, timezone: str = "UTC", current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def report_day(request: Request, response: Response, year: int, month: int, day: int, type: str | None = None, timezone: str = "UTC", current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
     """Get daily report for the current user"""
-    # Convert local date to UTC for proper timezone handling
-    try:
-        tz = pytz.timezone(timezone)
-        local_start = datetime(year, month, day, 0, 0, 0)
-        local_end = datetime(year, month, day, 23, 59, 59)
-        
-        # Convert to UTC
-        start = tz.localize(local_start).astimezone(pytz.UTC).replace(tzinfo=None)
-        end = tz.localize(local_end).astimezone(pytz.UTC).replace(tzinfo=None)
-    except pytz.exceptions.UnknownTimeZoneError:
-        # Fallback to UTC if timezone is invalid
-        start = datetime(year, month, day, 0, 0, 0)
-        end = datetime(year, month, day, 23, 59, 59)
-    stmt = (
-        select(Category.name, Category.type, func.sum(Transaction.amount).label("total"))
-        .join(Category)
-        .where(Transaction.created_at.between(start, end), Transaction.user_id == current_user.id)
-        .group_by(Category.id)
-        .order_by(func.sum(Transaction.amount).desc())
-    )
-    if type in {"income", "expense"}:
-        stmt = stmt.where(Category.type == type)
-    rows = db.execute(stmt).all()
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    # Local day [00:00, next day 00:00) converted to UTC
+    local_start = datetime(year, month, day)
+    start, end = local_range_to_utc(timezone, local_start, local_start + timedelta(days=1))
+    rows = await db.run_sync(rollup.category_totals, current_user.id, start, end, type)
+    return negotiated(request, [
+        {"category": name, "type": type_, "total": total}
+        for name, type_, total in rows
+    ], response)
+
+
+@router.get("/report/range")
+async def report_range(
+    request: Request,
+    response: Response,
+    date_from: date = Query(alias="from"),
+    date_to: date = Query(alias="to"),
+    bucket: Literal["day", "week", "month"] = "day",
+    type: str | None = None,
+    timezone: str = "UTC",
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get category totals per day/week/month bucket for a local date range [from, to).
+
+    Buckets are whole local days, ISO weeks or calendar months in the given
+    timezone (DST-aware), so each one matches /report/day or /report/month.
+    """
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    local_starts = bucket_starts(date_from, date_to, bucket)
+    boundaries = [local_range_to_utc(timezone, d, d)[0] for d in local_starts]
+    rows = await db.run_sync(rollup.bucketed_totals, current_user.id, boundaries, type)
+    return negotiated(request, range_report_rows(local_starts, rows), response)
+
+
+def range_report_rows(local_starts: list[datetime], rows) -> list[dict]:
     return [
-        {"category": r[0], "type": r[1], "total": float(r[2])}
-        for r in rows
+        {"bucket": local_starts[idx].date().isoformat(), "category": name, "type": type_, "total": total}
+        for idx, name, type_, total in rows
     ]
 
 
+@router.get("/dashboard", response_model=Dashboard)
+async def dashboard(
+    request: Request,
+    response: Response,
+    timezone: str = "UTC",
+    limit: int = Query(20, ge=0, le=200),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Everything the app's start screen needs in one call: balance, this month's
+    breakdown in the user's timezone, categories and the latest transactions"""
+    now = local_now(timezone)
+    # The month shown rolls over without any write, so it is part of the ETag
+    not_modified = await versions.check_not_modified(request, response, db, current_user.id, f"{now:%Y%m}")
+    if not_modified:
+        return not_modified
+    start, end = local_range_to_utc(timezone, *month_range(now.year, now.month))
+
+    # One pass over categories x rollup yields the category list, the balance and the month totals
+    overview = await db.run_sync(rollup.category_overview, current_user.id, start, end)
+    income = sum(float(row[3]) for row in overview if row[2] == "income")
+    expense = sum(float(row[3]) for row in overview if row[2] == "expense")
+    if rollup.is_hour_aligned(start) and rollup.is_hour_aligned(end):
+        month = sorted(
+            (CategoryTotal(category=name, type=type_, total=float(total))
+             for _, name, type_, _, total, count in overview if count),
+            key=lambda item: item.total,
+            reverse=True,
+        )
+    else:
+        month = [
+            CategoryTotal(category=name, type=type_, total=total)
+            for name, type_, total in await db.run_sync(rollup.category_totals, current_user.id, start, end)
+        ]
+
+    # Through the archive too, so a user whose history is all archived still sees it
+    t = archive.source(await db.run_sync(archive.archived_before))
+    transactions = (await db.execute(
+        select(*transaction_columns(t))
+        .where(t.user_id == current_user.id)
+        .order_by(t.created_at.desc(), t.id.desc())
+        .limit(limit)
+    )).all()
+
+    return negotiated(request, Dashboard(
+        balance=Balance(income=income, expense=expense, net=income - expense),
+        month=month,
+        categories=[
+            CategorySchema(id=id_, name=name, type=type_, user_id=current_user.id)
+            for id_, name, type_, *_ in overview
+        ],
+        transactions=[TransactionSchema(**row._mapping) for row in transactions],
+    ).model_dump(), response)
+
+
 @router.get("/export/csv")
-def export_csv(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Export transactions as CSV for the current user"""
-    rows = db.execute(
-        select(
-            Transaction.id, Transaction.created_at, Transaction.amount, Transaction.note, Category.name, Category.type
-        ).join(Category).where(Transaction.user_id == current_user.id)
-    ).all()
-    df = pd.DataFrame(rows, columns=["id", "created_at", "amount", "note", "category", "type"])
-    buf = StringIO()
-    df.to_csv(buf, index=False)
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=transactions.csv"})
+async def export_csv(
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    session_factory: sessionmaker[Session] = Depends(get_read_sessionmaker),
+):
+    """Export transactions as CSV for the current user, streamed in chunks from a DB cursor"""
+    return StreamingResponse(
+        iter_csv(current_user.id, date_from, date_to, category_id, session_factory),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=transactions.csv"},
+    )
+
+
+@router.get("/export/parquet")
+async def export_parquet(
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    session_factory: sessionmaker[Session] = Depends(get_read_sessionmaker),
+):
+    """Export transactions as a typed Parquet file, written one row group at a time from a DB cursor"""
+    return StreamingResponse(
+        iter_arrow(current_user.id, "parquet", date_from, date_to, category_id, session_factory),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": "attachment; filename=transactions.parquet"},
+    )
+
+
+@router.get("/export/arrow")
+async def export_arrow(
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    session_factory: sessionmaker[Session] = Depends(get_read_sessionmaker),
+):
+    """Export transactions as a typed Arrow IPC file, written one record batch at a time from a DB cursor"""
+    return StreamingResponse(
+        iter_arrow(current_user.id, "arrow", date_from, date_to, category_id, session_factory),
+        media_type="application/vnd.apache.arrow.file",
+        headers={"Content-Disposition": "attachment; filename=transactions.arrow"},
+    )
 
 
+def job_response(job: Job, response: Response) -> JobSchema:
+    schema = JobSchema.model_validate(job)
+    if job.status == "done":
+        schema.result_url = f"/jobs/{job.id}/result"
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return schema
+
+
+@router.post("/jobs/export", response_model=JobSchema, status_code=202)
+async def create_export_job(
+    response: Response,
+    format: Literal["csv", "parquet", "arrow"] = "csv",
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Export transactions in the background; poll GET /jobs/{id}, then download its result_url.
+
+    Same filters and formats as /export/*. An unchanged request for unchanged
+    data returns the existing job.
+    """
+    user_id = current_user.id
+
+    def produce(session_factory):
+        if format == "csv":
+            return iter_csv(user_id, date_from, date_to, category_id, session_factory)
+        return iter_arrow(user_id, format, date_from, date_to, category_id, session_factory)
+
+    params = {"from": date_from, "to": date_to, "category_id": category_id}
+    job = await run_in_threadpool(jobs.submit, user_id, f"export_{format}", params, produce)
+    if job.status == "done":
+        response.status_code = 200
+    return job_response(job, response)
+
+
+@router.post("/jobs/report", response_model=JobSchema, status_code=202)
+async def create_report_job(
+    response: Response,
+    date_from: date = Query(alias="from"),
+    date_to: date = Query(alias="to"),
+    bucket: Literal["day", "week", "month"] = "day",
+    type: str | None = None,
+    timezone: str = "UTC",
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Compute /report/range in the background (e.g. several years by day); the result is its JSON body"""
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    user_id = current_user.id
+    local_starts = bucket_starts(date_from, date_to, bucket)
+    boundaries = [local_range_to_utc(timezone, d, d)[0] for d in local_starts]
+
+    def produce(session_factory):
+        with session_factory() as db:
+            rows = rollup.bucketed_totals(db, user_id, boundaries, type)
+        return [orjson.dumps(range_report_rows(local_starts, rows))]
+
+    params = {"from": date_from, "to": date_to, "bucket": bucket, "type": type, "timezone": timezone}
+    job = await run_in_threadpool(jobs.submit, user_id, "report_range", params, produce)
+    if job.status == "done":
+        response.status_code = 200
+    return job_response(job, response)
+
+
+async def _get_job(job_id: str, user_id: int, db: AsyncSession) -> Job:
+    job = await db.get(Job, job_id)
+    if not job or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobSchema)
+async def get_job(job_id: str, response: Response, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Status of a background job (read from the primary, where the workers record progress)"""
+    return job_response(await _get_job(job_id, current_user.id, db), response)
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Download the result file of a finished job"""
+    job = await _get_job(job_id, current_user.id, db)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    path = jobs.result_path(job.id)
+    if job.expires_at <= datetime.utcnow() or not path.exists():
+        raise HTTPException(status_code=410, detail="Job result has expired")
+    media_type, filename = jobs.RESULT_TYPES[job.kind]
+    return FileResponse(path, media_type=media_type, filename=filename)
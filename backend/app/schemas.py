@@ -1,8 +1,15 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, field_validator
+from datetime import datetime, timezone
 from typing import Optional
 
 
+def to_utc_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert aware datetimes from clients accordingly"""
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
 # Auth Schemas
 class UserRegister(BaseModel):
     email: EmailStr
@@ -58,6 +65,8 @@ class TransactionCreate(BaseModel):
     note: Optional[str] = None
     created_at: Optional[datetime] = None
 
+    _normalize_created_at = field_validator("created_at")(to_utc_naive)
+
 
 class TransactionUpdate(BaseModel):
     amount: Optional[float] = None
@@ -65,6 +74,8 @@ class TransactionUpdate(BaseModel):
     note: Optional[str] = None
     created_at: Optional[datetime] = None
 
+    _normalize_created_at = field_validator("created_at")(to_utc_naive)
+
 
 class TransactionSchema(BaseModel):
     id: int
@@ -83,3 +94,63 @@ class Balance(BaseModel):
     income: float
     expense: float
     net: float
+
+
+# Report Schemas
+class CategoryTotal(BaseModel):
+    category: str
+    type: str
+    total: float
+
+
+# Dashboard Schema
+class Dashboard(BaseModel):
+    balance: Balance
+    month: list[CategoryTotal]
+    categories: list[CategorySchema]
+    transactions: list[TransactionSchema]
+
+
+# Sync Schemas
+class SyncCategory(CategorySchema):
+    updated_at: Optional[datetime] = None
+
+
+class SyncTransaction(TransactionSchema):
+    updated_at: Optional[datetime] = None
+
+
+class SyncChanges(BaseModel):
+    cursor: int
+    full: bool  # True: a snapshot replacing everything the client holds
+    categories: list[SyncCategory]
+    transactions: list[SyncTransaction]
+    deleted_categories: list[int]
+    deleted_transactions: list[int]
+
+
+class JobSchema(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued | running | done | failed
+    error: Optional[str] = None
+    size: Optional[int] = None  # result size in bytes once done
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    expires_at: datetime
+    result_url: Optional[str] = None  # set once done
+
+    class Config:
+        from_attributes = True
+
+
+# Bulk Import Schemas
+class ImportRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class ImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[ImportRowError]
@@ -0,0 +1,221 @@
+"""Full-text search over transaction notes and category names.
+
+Each transaction has a search document in `transaction_search`: an FTS5
+virtual table on SQLite, a tsvector table with a GIN index on PostgreSQL.
+Database triggers keep it in sync with inserts, updates and deletes of
+transactions (including bulk inserts and COPY) and with category renames, so
+no write path has to remember it. Archived transactions (see archive.py) keep
+their documents: the delete triggers spare a row that is being moved into
+transactions_archive, and queries look rows up in both tables.
+
+Queries are split into words; every word must match, as a prefix, either the
+note or the category name. Matches are ranked (notes weigh more than
+category names) and only the matching rows are read, so latency follows the
+number of hits rather than the size of the account.
+
+Rebuild the index from the transactions with:
+
+    python -m backend.app.search rebuild
+"""
+import re
+import sys
+
+from sqlalchemy import DateTime, Float, Integer, String, column, delete, inspect, table, text
+
+from .db import SessionLocal, engine
+
+
+# Words taken from a query; anything else (quotes, operators) is ignored
+MAX_QUERY_TERMS = 8
+WORD = re.compile(r"\w+", re.UNICODE)
+
+SQLITE_DDL = [
+    # owner holds "u<user_id>" so the user filter is an index lookup, not a post-filter
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transaction_search USING fts5(
+        owner, note, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    # The delete first: a transaction restored from the archive still has its document
+    """CREATE TRIGGER IF NOT EXISTS transaction_search_insert AFTER INSERT ON transactions BEGIN
+        DELETE FROM transaction_search WHERE rowid = new.id;
+        INSERT INTO transaction_search (rowid, owner, note, category)
+        VALUES (new.id, 'u' || new.user_id, coalesce(new.note, ''),
+                coalesce((SELECT name FROM categories WHERE id = new.category_id), ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_search_update AFTER UPDATE OF note, category_id, user_id ON transactions BEGIN
+        DELETE FROM transaction_search WHERE rowid = old.id;
+        INSERT INTO transaction_search (rowid, owner, note, category)
+        VALUES (new.id, 'u' || new.user_id, coalesce(new.note, ''),
+                coalesce((SELECT name FROM categories WHERE id = new.category_id), ''));
+    END""",
+    # Archiving copies a row into transactions_archive before deleting it here
+    """CREATE TRIGGER IF NOT EXISTS transaction_search_delete AFTER DELETE ON transactions
+    WHEN NOT EXISTS (SELECT 1 FROM transactions_archive WHERE user_id = old.user_id AND id = old.id) BEGIN
+        DELETE FROM transaction_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_search_category_rename AFTER UPDATE OF name ON categories BEGIN
+        UPDATE transaction_search SET category = new.name
+        WHERE rowid IN (SELECT id FROM transactions WHERE category_id = new.id)
+           OR rowid IN (SELECT id FROM transactions_archive WHERE user_id = new.user_id AND category_id = new.id);
+    END""",
+]
+
+# {rows}: the transactions, or their union with the archive
+SQLITE_REBUILD = [
+    "DELETE FROM transaction_search",
+    """INSERT INTO transaction_search (rowid, owner, note, category)
+       SELECT t.id, 'u' || t.user_id, coalesce(t.note, ''), coalesce(c.name, '')
+       FROM {rows} t LEFT JOIN categories c ON c.id = t.category_id""",
+]
+
+# 'simple' configuration: no stemming, since notes mix Russian, German and English
+PG_DOCUMENT = "setweight(to_tsvector('simple', coalesce({note}, '')), 'A') || setweight(to_tsvector('simple', coalesce({category}, '')), 'B')"
+
+PG_DDL = [
+    """CREATE TABLE IF NOT EXISTS transaction_search (
+        transaction_id integer PRIMARY KEY,
+        user_id integer NOT NULL,
+        document tsvector NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_transaction_search_document ON transaction_search USING gin (document)",
+    "CREATE INDEX IF NOT EXISTS ix_transaction_search_user_id ON transaction_search (user_id)",
+    f"""CREATE OR REPLACE FUNCTION transaction_search_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO transaction_search (transaction_id, user_id, document)
+        VALUES (NEW.id, NEW.user_id, {PG_DOCUMENT.format(note="NEW.note", category="(SELECT name FROM categories WHERE id = NEW.category_id)")})
+        ON CONFLICT (transaction_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS transaction_search_sync ON transactions",
+    # Legacy transactions without an owner can't be found by anyone, so they get no document
+    """CREATE TRIGGER transaction_search_sync AFTER INSERT OR UPDATE OF note, category_id, user_id ON transactions
+        FOR EACH ROW WHEN (NEW.user_id IS NOT NULL) EXECUTE FUNCTION transaction_search_sync()""",
+    # transactions is partitioned, so no foreign key can cascade deletes; an update
+    # that moves a row to another partition also deletes it there, and archiving
+    # copies a row into transactions_archive before deleting it, hence the checks
+    """CREATE OR REPLACE FUNCTION transaction_search_delete() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM transaction_search WHERE transaction_id = OLD.id
+        AND NOT EXISTS (SELECT 1 FROM transactions WHERE id = OLD.id)
+        AND NOT EXISTS (SELECT 1 FROM transactions_archive WHERE user_id = OLD.user_id AND id = OLD.id);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS transaction_search_delete ON transactions",
+    """CREATE TRIGGER transaction_search_delete AFTER DELETE ON transactions
+        FOR EACH ROW EXECUTE FUNCTION transaction_search_delete()""",
+    f"""CREATE OR REPLACE FUNCTION transaction_search_category_rename() RETURNS trigger AS $$
+    BEGIN
+        UPDATE transaction_search s SET document = {PG_DOCUMENT.format(note="t.note", category="NEW.name")}
+        FROM transactions t WHERE t.id = s.transaction_id AND t.category_id = NEW.id;
+        UPDATE transaction_search s SET document = {PG_DOCUMENT.format(note="a.note", category="NEW.name")}
+        FROM transactions_archive a WHERE a.id = s.transaction_id AND a.user_id = NEW.user_id AND a.category_id = NEW.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS transaction_search_category_rename ON categories",
+    """CREATE TRIGGER transaction_search_category_rename AFTER UPDATE OF name ON categories
+        FOR EACH ROW EXECUTE FUNCTION transaction_search_category_rename()""",
+]
+
+PG_REBUILD = [
+    "DELETE FROM transaction_search",
+    f"""INSERT INTO transaction_search (transaction_id, user_id, document)
+        SELECT t.id, t.user_id, {PG_DOCUMENT.format(note="t.note", category="c.name")}
+        FROM {{rows}} t LEFT JOIN categories c ON c.id = t.category_id
+        WHERE t.user_id IS NOT NULL""",
+]
+
+# Documents for the rows of one table (a partition being attached), replacing any existing ones
+PG_INDEX_ROWS = f"""INSERT INTO transaction_search (transaction_id, user_id, document)
+    SELECT t.id, t.user_id, {PG_DOCUMENT.format(note="t.note", category="c.name")}
+    FROM {{table}} t LEFT JOIN categories c ON c.id = t.category_id
+    WHERE t.user_id IS NOT NULL
+    ON CONFLICT (transaction_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document"""
+
+RESULT_COLUMNS = {
+    "id": Integer,
+    "amount": Float,
+    "note": String,
+    "created_at": DateTime,
+    "category_id": Integer,
+    "user_id": Integer,
+}
+
+
+def rebuild(conn) -> None:
+    """Recreate every search document from the transactions and the archive"""
+    rows = "transactions"
+    if inspect(conn).has_table("transactions_archive"):
+        rows = """(SELECT id, user_id, note, category_id FROM transactions
+                   UNION ALL SELECT id, user_id, note, category_id FROM transactions_archive)"""
+    for statement in PG_REBUILD if conn.dialect.name == "postgresql" else SQLITE_REBUILD:
+        conn.execute(text(statement.format(rows=rows)))
+
+
+def ensure_search_index(bind=engine) -> None:
+    """Create the search table and its triggers if missing, filling it for existing rows"""
+    with bind.begin() as conn:
+        existed = inspect(conn).has_table("transaction_search")
+        for statement in PG_DDL if conn.dialect.name == "postgresql" else SQLITE_DDL:
+            conn.execute(text(statement))
+        if not existed:
+            rebuild(conn)
+
+
+def delete_documents(db, transaction_ids) -> None:
+    """Drop the documents of transactions deleted without the triggers noticing (`transaction_ids`: a select)"""
+    key = "transaction_id" if db.get_bind().dialect.name == "postgresql" else "rowid"
+    db.execute(delete(table("transaction_search", column(key))).where(column(key).in_(transaction_ids)))
+
+
+def drop_search_index(bind=engine) -> None:
+    """Drop the search table"""
+    with bind.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS transaction_search"))
+
+
+def query_terms(q: str) -> list[str]:
+    return [term.lower() for term in WORD.findall(q)][:MAX_QUERY_TERMS]
+
+
+def search_statement(dialect: str, user_id: int, terms: list[str], limit: int, offset: int):
+    """Ranked page of the user's transactions, archived ones included, matching all terms (as prefixes)"""
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+    if dialect == "postgresql":
+        # Terms are \\w+ only, so they can't inject tsquery operators
+        params["query"] = " & ".join(f"{term}:*" for term in terms)
+        sql = """
+            SELECT s.transaction_id AS id, coalesce(t.amount, a.amount)::float8 AS amount,
+                   coalesce(t.note, a.note) AS note, coalesce(t.created_at, a.created_at) AS created_at,
+                   coalesce(t.category_id, a.category_id) AS category_id, s.user_id
+            FROM transaction_search s
+            LEFT JOIN transactions t ON t.id = s.transaction_id
+            LEFT JOIN transactions_archive a ON a.user_id = s.user_id AND a.id = s.transaction_id
+            WHERE s.user_id = :user_id AND s.document @@ to_tsquery('simple', :query)
+              AND (t.id IS NOT NULL OR a.id IS NOT NULL)
+            ORDER BY ts_rank(s.document, to_tsquery('simple', :query)) DESC, s.transaction_id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        words = " AND ".join(f'"{term}"*' for term in terms)
+        params["query"] = f'owner : "u{user_id}" AND {{note category}} : ({words})'
+        sql = """
+            SELECT s.rowid AS id, CAST(coalesce(t.amount, a.amount) AS FLOAT) AS amount,
+                   coalesce(t.note, a.note) AS note, coalesce(t.created_at, a.created_at) AS created_at,
+                   coalesce(t.category_id, a.category_id) AS category_id, :user_id AS user_id
+            FROM transaction_search s
+            LEFT JOIN transactions t ON t.id = s.rowid
+            LEFT JOIN transactions_archive a ON a.user_id = :user_id AND a.id = s.rowid
+            WHERE transaction_search MATCH :query AND (t.id IS NOT NULL OR a.id IS NOT NULL)
+            ORDER BY bm25(transaction_search, 0.0, 2.0, 1.0), s.rowid DESC
+            LIMIT :limit OFFSET :offset
+        """
+    return text(sql).columns(**RESULT_COLUMNS), params
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m backend.app.search rebuild")
+    ensure_search_index()
+    with SessionLocal() as db:
+        rebuild(db.connection())
+        db.commit()
+    print("✅ Search index rebuilt")
@@ -0,0 +1,170 @@
+"""Serving the built frontend (frontend/dist) next to the API.
+
+`SPAStaticFiles` is mounted at "/" after the API routers, so API routes always
+match first. It adds, on top of Starlette's StaticFiles:
+
+- precompressed `.br` / `.gz` siblings of a file, picked by Accept-Encoding;
+- `Cache-Control: immutable` for fingerprinted build assets (assets/name-HASH.ext),
+  `no-cache` (revalidate via ETag) for everything else;
+- index.html held in memory (with its compressed variants) and returned for
+  unknown paths when the client asks for HTML, i.e. SPA deep links. Other
+  clients, and any path under an API prefix, keep getting a plain 404.
+
+Variants are produced at startup by `precompress` (brotli only if the module is
+installed), or ahead of time with:
+
+    python -m backend.app.static frontend/dist
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .admission import API_PREFIXES
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Vite's default output name for hashed assets: assets/<name>-<8+ char hash>.<ext>
+FINGERPRINTED = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+COMPRESSIBLE_SUFFIXES = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".wasm", ".ico"}
+# Files smaller than this aren't worth a variant
+MIN_COMPRESS_SIZE = 1024
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Unknown paths below these are mistyped API calls, never SPA deep links
+NO_FALLBACK_PREFIXES = (*API_PREFIXES, "/metrics", "/health")
+
+
+def accepted_encodings(headers: Headers) -> set[str]:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.lower())
+    return accepted
+
+
+def is_api_path(path: str) -> bool:
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in NO_FALLBACK_PREFIXES)
+
+
+def wants_html(scope) -> bool:
+    return scope["method"] in ("GET", "HEAD") and "text/html" in Headers(scope=scope).get("accept", "")
+
+
+def precompress(directory: Path) -> int:
+    """Write .gz (and .br when brotli is available) next to compressible files; returns files written"""
+    written = 0
+    for path in directory.rglob("*"):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        stat = path.stat()
+        if stat.st_size < MIN_COMPRESS_SIZE:
+            continue
+        data = None
+        for encoding, suffix in ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            target = path.with_name(path.name + suffix)
+            if target.exists() and target.stat().st_mtime >= stat.st_mtime:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            compressed = brotli.compress(data, quality=11) if encoding == "br" else gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) >= len(data):
+                continue
+            target.write_bytes(compressed)
+            written += 1
+    return written
+
+
+class SPAStaticFiles(StaticFiles):
+    def __init__(self, directory: Path, index: str = "index.html", **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.root = Path(directory).resolve()
+        self.index_path = Path(directory) / index
+        self.index_variants: dict[Optional[str], bytes] = {}
+        self.index_etag = ""
+        self.load_index()
+
+    def load_index(self) -> None:
+        """Read index.html once and keep it in memory with its compressed forms"""
+        content = self.index_path.read_bytes()
+        self.index_variants = {None: content, "gzip": gzip.compress(content, mtime=0)}
+        if brotli is not None:
+            self.index_variants["br"] = brotli.compress(content)
+        # Weak: the same tag covers the identity and the compressed representations
+        self.index_etag = f'W/"{hashlib.md5(content).hexdigest()}"'
+
+    def index_response(self, scope) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {"ETag": self.index_etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+        if_none_match = [tag.strip().removeprefix("W/") for tag in request_headers.get("if-none-match", "").split(",")]
+        if self.index_etag.removeprefix("W/") in if_none_match:
+            return Response(status_code=304, headers=headers)
+        accepted = accepted_encodings(request_headers)
+        encoding = next((e for e, _ in ENCODINGS if e in accepted and e in self.index_variants), None)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(self.index_variants[encoding], media_type="text/html", headers=headers)
+
+    async def get_response(self, path: str, scope) -> Response:
+        if path in ("", ".", "index.html"):
+            return self.index_response(scope)
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            # Client-side routes (deep links) get the app shell; everything else a real 404
+            if exc.status_code == 404 and wants_html(scope) and not is_api_path(scope["path"]):
+                return self.index_response(scope)
+            raise
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = Path(full_path).relative_to(self.root).as_posix()
+        cache_control = IMMUTABLE if FINGERPRINTED.match(relative) else REVALIDATE
+
+        response = None
+        accepted = accepted_encodings(request_headers)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            variant = f"{full_path}{suffix}"
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            if variant_stat.st_mtime < stat_result.st_mtime:
+                continue  # stale variant from an earlier build
+            media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+            response = FileResponse(variant, status_code=status_code, stat_result=variant_stat, media_type=media_type)
+            response.headers["Content-Encoding"] = encoding
+            break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        response.headers["Cache-Control"] = cache_control
+        response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1] if len(sys.argv) > 1 else "frontend/dist")
+    print(f"✅ Wrote {precompress(target)} compressed variants under {target}")
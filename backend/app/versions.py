@@ -0,0 +1,84 @@
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .db import dialect_insert
+from .encoding import VARY, wants_msgpack
+from .replica import note_write
+from .models import UserDataVersion
+
+
+def bump(db: Session, user_id: int) -> int:
+    """Increment the user's data version and return it (call in the same transaction as the write).
+
+    The upsert locks the user's version row until commit, so concurrent writes
+    of one user commit in version order; /sync relies on that.
+    """
+    stmt = dialect_insert(db.get_bind())(UserDataVersion).values(user_id=user_id, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDataVersion.user_id],
+        set_={"version": UserDataVersion.version + 1},
+    ).returning(UserDataVersion.version)
+    version = db.execute(stmt).scalar_one()
+    note_write(user_id, version)
+    return version
+
+
+def bump_many(db: Session, user_ids: Iterable[int]) -> dict[int, int]:
+    """`bump` for several users in one statement; returns user id -> new version"""
+    # Same lock order in every transaction, so two batches can't deadlock
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return {}
+    stmt = dialect_insert(db.get_bind())(UserDataVersion).values([{"user_id": user_id, "version": 1} for user_id in user_ids])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDataVersion.user_id],
+        set_={"version": UserDataVersion.version + 1},
+    ).returning(UserDataVersion.user_id, UserDataVersion.version)
+    versions = {user_id: version for user_id, version in db.execute(stmt)}
+    for user_id, version in versions.items():
+        note_write(user_id, version)
+    return versions
+
+
+def make_etag(user_id: int, version: int, *variant) -> str:
+    """Weak ETag for a user's data at `version`; `variant` distinguishes representations
+    whose content also depends on something besides the data (e.g. the current month)"""
+    tag = "-".join(str(part) for part in (user_id, version, *variant))
+    return f'W/"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in if_none_match.split(","))
+
+
+async def check_not_modified(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    user_id: int,
+    *variant,
+) -> Optional[Response]:
+    """Return a 304 response if the client already holds the current version, else set the ETag.
+
+    Must run before the endpoint reads any data: the version is read first, so
+    a write that lands in between can only make the ETag too old, never too new.
+    """
+    version = await db.scalar(select(UserDataVersion.version).where(UserDataVersion.user_id == user_id))
+    if wants_msgpack(request):
+        variant = (*variant, "msgpack")
+    etag = make_etag(user_id, version or 0, *variant)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        # Same Vary as the 200 it stands for, so caches keep JSON and MessagePack apart
+        return Response(status_code=304, headers={"ETag": etag, "Vary": VARY})
+    response.headers["ETag"] = etag
+    return None
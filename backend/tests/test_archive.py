@@ -0,0 +1,59 @@
+from backend.app import archive
+from backend.app.db import engine
+
+
+def _category_id(client, auth, name: str) -> int:
+    return next(c["id"] for c in client.get("/categories", headers=auth).json() if c["name"] == name)
+
+
+def _archived_transaction(client, auth, note: str, category: str = "Food") -> int:
+    payload = {"amount": 12.5, "category_id": _category_id(client, auth, category), "note": note, "created_at": "2019-03-14T12:00:00"}
+    r = client.post("/transactions", json=payload, headers=auth)
+    assert r.status_code == 200, r.text
+    archive.run(engine, months=24)
+    return r.json()["id"]
+
+
+def _search(client, auth, q: str) -> list[int]:
+    r = client.get("/transactions/search", params={"q": q}, headers=auth)
+    assert r.status_code == 200, r.text
+    return [t["id"] for t in r.json()]
+
+
+def test_archived_transactions_stay_searchable(client, auth):
+    transaction_id = _archived_transaction(client, auth, "dentist appointment")
+    assert _search(client, auth, "dentist") == [transaction_id]
+    [found] = client.get("/transactions/search", params={"q": "dent food"}, headers=auth).json()
+    assert found["note"] == "dentist appointment"
+    assert found["amount"] == 12.5
+
+
+def test_renaming_a_category_reaches_archived_documents(client, auth):
+    transaction_id = _archived_transaction(client, auth, "weekly shop")
+    r = client.put(f"/categories/{_category_id(client, auth, 'Food')}", json={"name": "Groceries", "type": "expense"}, headers=auth)
+    assert r.status_code == 200, r.text
+    assert _search(client, auth, "groceries") == [transaction_id]
+
+
+def test_restored_and_deleted_transactions(client, auth):
+    transaction_id = _archived_transaction(client, auth, "old laptop")
+    payload = {"amount": 900, "category_id": _category_id(client, auth, "Food"), "note": "old laptop repaired", "created_at": "2019-03-14T12:00:00"}
+    assert client.put(f"/transactions/{transaction_id}", json=payload, headers=auth).status_code == 200
+    assert _search(client, auth, "repaired") == [transaction_id]
+
+    other_id = _archived_transaction(client, auth, "broken kettle")
+    assert client.delete(f"/transactions/{other_id}", headers=auth).status_code == 200
+    assert _search(client, auth, "kettle") == []
+
+
+def test_deleting_a_category_drops_archived_documents(client, auth):
+    _archived_transaction(client, auth, "cinema tickets")
+    assert client.delete(f"/categories/{_category_id(client, auth, 'Food')}", headers=auth).status_code == 200
+    assert _search(client, auth, "cinema") == []
+
+
+def test_dashboard_lists_archived_transactions(client, auth):
+    transaction_id = _archived_transaction(client, auth, "old rent")
+    dashboard = client.get("/dashboard", headers=auth).json()
+    assert [t["id"] for t in dashboard["transactions"]] == [transaction_id]
+    assert dashboard["transactions"][0]["note"] == "old rent"
@@ -0,0 +1,24 @@
+def _vary(response) -> set[str]:
+    return {part.strip() for part in response.headers.get("Vary", "").split(",") if part.strip()}
+
+
+def test_not_modified_until_a_write(client, auth):
+    first = client.get("/categories", headers=auth)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get("/categories", headers={**auth, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert _vary(cached) == _vary(first) >= {"Accept", "Accept-Encoding"}
+
+    # The MessagePack representation has its own ETag
+    packed = client.get("/categories", headers={**auth, "If-None-Match": etag, "Accept": "application/msgpack"})
+    assert packed.status_code == 200
+    assert packed.headers["ETag"] != etag
+
+    assert client.post("/categories", json={"name": "Boat", "type": "expense"}, headers=auth).status_code == 200
+    fresh = client.get("/categories", headers={**auth, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert "Boat" in [c["name"] for c in fresh.json()]
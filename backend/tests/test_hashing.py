@@ -0,0 +1,19 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from backend.app import hashing
+
+
+def test_a_timed_out_hash_job_answers_503(monkeypatch):
+    monkeypatch.setattr(hashing, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(hashing, "PASSWORD_HASH_TIMEOUT_SECONDS", 0.001)
+    try:
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(hashing._run(time.sleep, 0.5))
+        assert raised.value.status_code == 503
+        assert raised.value.headers["Retry-After"] == "1"
+    finally:
+        hashing.shutdown_pool()
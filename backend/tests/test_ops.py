@@ -0,0 +1,23 @@
+import pytest
+
+from backend.app import auth
+
+OPS_PATHS = ("/metrics", "/health/db", "/health/cache")
+
+
+def test_health_stays_public(client):
+    assert client.get("/health").json() == {"status": "ok"}
+
+
+def test_ops_endpoints_refuse_remote_clients_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(auth, "OPS_TOKEN", "")
+    for path in OPS_PATHS:
+        assert client.get(path).status_code == 403, path
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_ops_endpoints_accept_the_token(client, monkeypatch, path):
+    monkeypatch.setattr(auth, "OPS_TOKEN", "ops-secret")
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get(path, headers={"Authorization": "Bearer ops-secret"}).status_code == 200
@@ -0,0 +1,103 @@
+"""Migration 3 (partition_transactions) on a real PostgreSQL; SQLite has no partitions.
+
+Opt-in: TEST_DATABASE_URL must point at a scratch PostgreSQL database, which
+the test wipes.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.app import archive, migrations
+from backend.app.models import Category, SchemaMigration, Transaction, User
+
+POSTGRES_URL = os.getenv("TEST_DATABASE_URL", "")
+
+pytestmark = pytest.mark.skipif(
+    not POSTGRES_URL.startswith("postgresql"), reason="set TEST_DATABASE_URL to a scratch PostgreSQL database"
+)
+
+
+@pytest.fixture
+def bind():
+    engine = create_engine(POSTGRES_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    yield engine
+    engine.dispose()
+
+
+def _seed_before_partitioning(bind) -> None:
+    """A database as migrations 1 and 2 left it, with 30 months of history and an ownerless row"""
+    for version, name, migrate in migrations.MIGRATIONS[:2]:
+        migrate(bind)
+        with bind.begin() as conn:
+            conn.execute(insert(SchemaMigration).values(version=version, name=name, applied_at=datetime.utcnow()))
+    now = datetime.utcnow().replace(microsecond=0)
+    with bind.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "a@example.com"}, {"id": 2, "email": "b@example.com"}])
+        conn.execute(insert(Category), [
+            {"id": 1, "name": "Food", "type": "expense", "user_id": 1},
+            {"id": 2, "name": "Salary", "type": "income", "user_id": 2},
+        ])
+        conn.execute(text("SELECT setval('users_id_seq', 2), setval('categories_id_seq', 2)"))
+        conn.execute(insert(Transaction), [
+            {"amount": day % 50 + 1, "note": f"note {day}", "created_at": now - timedelta(days=day), "category_id": 1 + day % 2, "user_id": 1 + day % 2}
+            for day in range(0, 900, 5)
+        ] + [{"amount": 3, "note": "ownerless", "created_at": now - timedelta(days=400), "category_id": None, "user_id": None}])
+
+
+def _counts(conn) -> dict:
+    return dict(conn.execute(select(Transaction.user_id, func.count()).group_by(Transaction.user_id)).all())
+
+
+def test_partitioning_keeps_rows_keys_and_archive_reads(bind):
+    _seed_before_partitioning(bind)
+    with bind.connect() as conn:
+        before = _counts(conn)
+        ids = set(conn.scalars(select(Transaction.id)))
+
+    assert migrations.upgrade(bind) == [3]
+
+    with bind.begin() as conn:
+        assert conn.scalar(text("SELECT relkind FROM pg_class WHERE relname = 'transactions'")) == "p"
+        assert _counts(conn) == before
+        assert set(conn.scalars(select(Transaction.id))) == ids
+        # Every owned row got its search document back
+        assert conn.scalar(text("SELECT count(*) FROM transaction_search")) == len(ids) - 1
+
+        foreign_keys = conn.scalars(text(
+            """SELECT confrelid::regclass::text FROM pg_constraint
+               WHERE conrelid = 'transactions'::regclass AND contype = 'f'"""
+        )).all()
+        assert sorted(foreign_keys) == ["categories", "users"]
+        with pytest.raises(IntegrityError), conn.begin_nested():
+            conn.execute(insert(Transaction).values(amount=1, created_at=datetime.utcnow(), category_id=999, user_id=1))
+
+        # The id sequence moved over with the table
+        assert conn.scalar(text("SELECT pg_get_serial_sequence('transactions', 'id')")) is not None
+        new_id = conn.scalar(insert(Transaction).values(amount=1, created_at=datetime.utcnow(), category_id=1, user_id=1).returning(Transaction.id))
+        assert new_id > max(ids)
+        before[1] += 1
+
+    moved = archive.run(bind, months=12)
+    assert moved > 0
+    with Session(bind) as db:
+        hot = db.scalar(select(func.count()).select_from(Transaction))
+        assert hot + moved == len(ids) + 1
+        watermark = archive.archived_before(db)
+        assert archive.source(watermark) is not Transaction
+        t = archive.source(watermark)
+        assert dict(db.execute(select(t.user_id, func.count()).group_by(t.user_id)).all()) == before
+        # Reads above the watermark skip the archive
+        assert archive.source(watermark, watermark) is Transaction
+
+        # Archived ids are not handed out again
+        created = Transaction(amount=2, created_at=datetime.utcnow(), category_id=2, user_id=2)
+        db.add(created)
+        db.commit()
+        assert created.id > new_id
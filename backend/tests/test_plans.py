@@ -0,0 +1,34 @@
+"""The query-plan check of benchmarks/plans.py: no full scans or temporary sorts beyond its ALLOWED list.
+
+Runs on a temporary SQLite file, and on PostgreSQL too when TEST_DATABASE_URL is set.
+"""
+import multiprocessing
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from benchmarks import plans
+
+POSTGRES_URL = os.getenv("TEST_DATABASE_URL", "")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.parametrize("database_url", [
+    None,
+    pytest.param(POSTGRES_URL, marks=pytest.mark.skipif(
+        not POSTGRES_URL.startswith("postgresql"), reason="set TEST_DATABASE_URL to a scratch PostgreSQL database"
+    ), id="postgresql"),
+], ids=["sqlite", "postgresql"])
+def test_no_unexpected_scans_or_sorts(database_url):
+    # check() binds the app to its own database, so it runs in a fresh process
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        report = pool.submit(plans.check, database_url, _free_port(), 2, 600).result(timeout=300)
+    assert report["statements_explained"] > 0
+    assert report["failures"] == []
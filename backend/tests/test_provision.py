@@ -0,0 +1,49 @@
+from sqlalchemy import select
+
+from backend.app.auth import get_password_hash
+from backend.app.db import SessionLocal
+from backend.app.models import Category
+from backend.app.provision import provision_existing_users, provision_users
+
+
+def test_backfill_reaches_sync_and_etags(client, auth):
+    categories = client.get("/categories", headers=auth)
+    etag = categories.headers["etag"]
+    cursor = client.get("/sync", headers=auth).json()["cursor"]
+    food = next(c for c in categories.json() if c["name"] == "Food")
+    # Gone behind the API's back, like a default added after the user registered
+    with SessionLocal() as db:
+        db.delete(db.get(Category, food["id"]))
+        db.commit()
+
+    with SessionLocal() as db:
+        provision_existing_users(db)
+
+    again = client.get("/categories", headers={**auth, "If-None-Match": etag})
+    assert again.status_code == 200
+    assert "Food" in [c["name"] for c in again.json()]
+    delta = client.get(f"/sync?since={cursor}", headers=auth).json()
+    assert [c["name"] for c in delta["categories"]] == ["Food"]
+
+
+def test_backfill_leaves_complete_users_alone(client, auth):
+    etag = client.get("/categories", headers=auth).headers["etag"]
+    with SessionLocal() as db:
+        provision_existing_users(db)
+    assert client.get("/categories", headers={**auth, "If-None-Match": etag}).status_code == 304
+
+
+def test_provisioned_users_sync_their_categories(client):
+    with SessionLocal() as db:
+        [user_id] = provision_users(db, 1, get_password_hash("secret"), "provisioned+{i}@example.com")
+        assert 0 not in db.scalars(select(Category.version).where(Category.user_id == user_id)).all()
+    token = client.post("/auth/login", json={"email": "provisioned+0@example.com", "password": "secret"}).json()["access_token"]
+    delta = client.get("/sync?since=0", headers={"Authorization": f"Bearer {token}"}).json()
+    assert not delta["full"]
+    assert len(delta["categories"]) > 0
+
+
+def test_registration_categories_reach_delta_sync(client, auth):
+    delta = client.get("/sync?since=0", headers=auth).json()
+    assert not delta["full"]
+    assert {c["name"] for c in delta["categories"]} == {c["name"] for c in client.get("/categories", headers=auth).json()}
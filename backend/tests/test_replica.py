@@ -0,0 +1,68 @@
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from backend.app import replica
+
+
+@pytest.fixture
+def stale_replica(client, tmp_path, monkeypatch):
+    """A copy of the primary that only catches up when `refresh` is called; reads on this worker use no window"""
+    primary, path = replica.sqlite_path(os.environ["DATABASE_URL"]), tmp_path / "replica.db"
+
+    def refresh() -> None:
+        source, target = sqlite3.connect(primary), sqlite3.connect(path)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+
+    refresh()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    monkeypatch.setattr(replica, "DATABASE_READ_URL", f"sqlite:///{path}")
+    monkeypatch.setattr(replica, "AsyncReadSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    # As if the write had been served by another worker
+    monkeypatch.setattr(replica, "READ_YOUR_WRITES_SECONDS", 0)
+    yield refresh
+    # The written-version cookie would follow the session's client into later tests
+    client.cookies.clear()
+    engine.sync_engine.dispose()
+
+
+def _names(client, headers) -> list[str]:
+    return [c["name"] for c in client.get("/categories", headers=headers).json()]
+
+
+def test_reads_wait_for_the_replica_to_reach_the_written_version(client, auth, stale_replica):
+    r = client.post("/categories", json={"name": "Boat", "type": "expense"}, headers=auth)
+    assert r.status_code == 200, r.text
+    written = r.headers[replica.WRITTEN_VERSION_HEADER]
+    assert client.cookies[replica.WRITTEN_VERSION_COOKIE] == written
+
+    # The cookie sends the read to the primary while the replica lags
+    behind = replica._decisions[("primary", "replica_behind")]
+    assert "Boat" in _names(client, auth)
+    assert replica._decisions[("primary", "replica_behind")] == behind + 1
+    # So does the header, for clients without cookies
+    client.cookies.clear()
+    assert "Boat" in _names(client, {**auth, replica.WRITTEN_VERSION_HEADER: written})
+    # A client that reports nothing reads the lagging replica
+    assert "Boat" not in _names(client, auth)
+
+    stale_replica()
+    served = replica._decisions[("replica", "replica")]
+    assert "Boat" in _names(client, {**auth, replica.WRITTEN_VERSION_HEADER: written})
+    assert replica._decisions[("replica", "replica")] == served + 1
+
+
+def test_another_users_written_version_is_ignored():
+    assert replica.written_version(_request({replica.WRITTEN_VERSION_HEADER: "7-12"}), 7) == 12
+    assert replica.written_version(_request({replica.WRITTEN_VERSION_HEADER: "8-12"}), 7) == 0
+    assert replica.written_version(_request({replica.WRITTEN_VERSION_HEADER: "junk"}), 7) == 0
+
+
+def _request(headers: dict) -> Request:
+    return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+# UTC times on both sides of local midnight: Berlin switches to summer time on
+# 2024-03-31 (local midnight is 23:00 UTC before, 22:00 UTC after), and
+# Kolkata's midnight is 18:30 UTC, halfway through an hourly rollup bucket
+TIMES = [
+    "2024-03-29T18:10:00", "2024-03-29T18:50:00", "2024-03-29T22:30:00", "2024-03-29T23:30:00",
+    "2024-03-30T22:30:00", "2024-03-30T23:30:00", "2024-03-31T00:30:00", "2024-03-31T01:30:00",
+    "2024-03-31T18:20:00", "2024-03-31T18:40:00", "2024-03-31T21:30:00", "2024-03-31T22:30:00",
+    "2024-03-31T23:30:00", "2024-04-01T18:29:00", "2024-04-01T18:31:00", "2024-04-30T18:45:00",
+    "2024-04-30T21:59:00", "2024-04-30T22:01:00",
+]
+
+
+def _totals(rows) -> dict[str, float]:
+    return {row["category"]: round(row["total"], 2) for row in rows}
+
+
+@pytest.fixture
+def history(client, auth):
+    categories = {c["name"]: c["id"] for c in client.get("/categories", headers=auth).json()}
+    for i, at in enumerate(TIMES):
+        # Distinct amounts, so a row counted in the wrong bucket changes a total
+        payload = {"amount": 2 ** i, "category_id": categories["Food" if i % 3 else "Salary"], "note": at, "created_at": at + "+00:00"}
+        assert client.post("/transactions", json=payload, headers=auth).status_code == 200
+    return auth
+
+
+@pytest.mark.parametrize("timezone", ["Europe/Berlin", "Asia/Kolkata"])
+def test_range_days_match_report_day(client, history, timezone):
+    params = {"from": "2024-03-28", "to": "2024-04-03", "bucket": "day", "timezone": timezone}
+    r = client.get("/report/range", params=params, headers=history)
+    assert r.status_code == 200, r.text
+    buckets: dict[str, list] = {}
+    for row in r.json():
+        buckets.setdefault(row["bucket"], []).append(row)
+
+    day = date(2024, 3, 28)
+    while day < date(2024, 4, 3):
+        single = client.get("/report/day", params={"year": day.year, "month": day.month, "day": day.day, "timezone": timezone}, headers=history)
+        assert _totals(buckets.get(day.isoformat(), [])) == _totals(single.json()), day
+        day += timedelta(days=1)
+    assert sum(len(rows) for rows in buckets.values()) > 0
+
+
+@pytest.mark.parametrize("timezone", ["Europe/Berlin", "Asia/Kolkata"])
+def test_range_months_match_report_month(client, history, timezone):
+    params = {"from": "2024-03-01", "to": "2024-06-01", "bucket": "month", "timezone": timezone}
+    r = client.get("/report/range", params=params, headers=history)
+    assert r.status_code == 200, r.text
+    for month in (3, 4, 5):
+        single = client.get("/report/month", params={"year": 2024, "month": month, "timezone": timezone}, headers=history)
+        bucket = datetime(2024, month, 1).date().isoformat()
+        assert _totals(row for row in r.json() if row["bucket"] == bucket) == _totals(single.json()), month
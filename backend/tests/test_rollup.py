@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from backend.app import migrations, rollup
+from backend.app.db import Base
+from backend.app.models import Category, Transaction, TransactionRollup, User
+
+
+def test_migrating_a_database_with_ownerless_transactions(tmp_path):
+    # Like backend/data.db: transactions from before user_id existed have none
+    bind = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    Base.metadata.create_all(bind)
+    at = datetime(2024, 5, 1, 10, 30)
+    with bind.begin() as conn:
+        conn.execute(insert(User).values(id=1, email="old@example.com", hashed_password="x"))
+        conn.execute(insert(Category).values(id=1, name="Food", type="expense", user_id=1))
+        conn.execute(insert(Transaction), [
+            {"amount": 5, "created_at": at, "category_id": 1, "user_id": 1},
+            {"amount": 7, "created_at": at, "category_id": 1, "user_id": None},
+        ])
+
+    migrations.upgrade(bind)
+    with Session(bind) as db:
+        rollup.ensure_populated(db)
+        rows = db.execute(select(TransactionRollup.user_id, TransactionRollup.amount_sum, TransactionRollup.txn_count)).all()
+        assert [(user_id, float(amount), count) for user_id, amount, count in rows] == [(1, 5.0, 1)]
+        assert rollup.check(db) == []
+
+        # Write paths skip them the same way
+        rollup.add_rows(db, [{"user_id": None, "category_id": 1, "created_at": at, "amount": 3}])
+        assert rollup.check(db) == []
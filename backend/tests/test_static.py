@@ -0,0 +1,29 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.static import SPAStaticFiles
+
+HTML = {"Accept": "text/html,application/xhtml+xml"}
+
+
+def spa_client(tmp_path) -> TestClient:
+    (tmp_path / "index.html").write_text("<!doctype html><div id=root></div>")
+    app = FastAPI()
+    app.mount("/", SPAStaticFiles(directory=tmp_path), name="frontend")
+    return TestClient(app)
+
+
+def test_deep_links_get_the_app_shell(tmp_path):
+    r = spa_client(tmp_path).get("/reports/2025", headers=HTML)
+    assert r.status_code == 200
+    assert "id=root" in r.text
+
+
+def test_unknown_api_paths_stay_json_404(tmp_path):
+    client = spa_client(tmp_path)
+    for path in ("/auth/whatever", "/transactions/x/y", "/jobs/missing/result", "/metrics/extra", "/health/nope"):
+        r = client.get(path, headers=HTML)
+        assert r.status_code == 404, path
+        assert r.json() == {"detail": "Not Found"}
+    # Only whole path segments count
+    assert client.get("/authors", headers=HTML).status_code == 200
@@ -0,0 +1,53 @@
+import base64
+
+import pytest
+
+
+@pytest.fixture
+def seven(client, auth) -> list[int]:
+    """Seven transactions, five of them at the very same time"""
+    category_id = client.get("/categories", headers=auth).json()[0]["id"]
+    times = ["2025-05-01T09:00:00"] * 5 + ["2025-05-02T09:00:00", "2025-04-30T09:00:00"]
+    ids = []
+    for at in times:
+        r = client.post("/transactions", json={"amount": 1, "category_id": category_id, "created_at": at}, headers=auth)
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+    return ids
+
+
+def test_cursor_pages_cover_every_row_once(client, auth, seven):
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/transactions", params=params, headers=auth)
+        assert r.status_code == 200, r.text
+        seen += [t["id"] for t in r.json()]
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert pages == 3
+    assert sorted(seen) == sorted(seven)
+    assert len(seen) == len(set(seen))
+    # Newest first; rows of the same time by id, descending
+    assert seen == [seven[5], *sorted(seven[:5], reverse=True), seven[6]]
+
+
+def test_no_cursor_on_the_last_page(client, auth, seven):
+    r = client.get("/transactions", params={"limit": 7}, headers=auth)
+    assert len(r.json()) == 7
+    assert "X-Next-Cursor" not in r.headers
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"2025-05-01T09:00:00").decode(),
+    base64.urlsafe_b64encode(b"yesterday|5").decode(),
+    base64.urlsafe_b64encode(b"2025-05-01T09:00:00|five").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+])
+def test_malformed_cursor_is_a_400(client, auth, cursor):
+    r = client.get("/transactions", params={"limit": 3, "cursor": cursor}, headers=auth)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
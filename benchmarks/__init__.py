@@ -0,0 +1,5 @@
+"""Load tests and micro-benchmarks for the finance API.
+
+Run the scripts as modules from the repository root, e.g.
+`python -m benchmarks.login_mixed_load --url http://localhost:8000`.
+"""
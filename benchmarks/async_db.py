@@ -0,0 +1,144 @@
+"""Sync-in-threadpool vs. native async database access.
+
+Serves the same two read queries (a user's categories and their latest
+transactions page) twice: once from plain `def` handlers on the sync Session,
+which Starlette runs on its threadpool, and once from `async def` handlers on
+the AsyncSession. Each variant is driven with the same number of concurrent
+clients and the report lists requests/sec and latency percentiles per variant.
+
+The app is started in a uvicorn subprocess against DATABASE_URL (SQLite by
+default), after seeding one user with default categories and transactions:
+
+    python -m benchmarks.async_db --concurrency 128 --duration 15
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.app.db import Base, SessionLocal, engine, get_async_db, get_db
+from backend.app.models import Category, Transaction, User
+
+from .common import LoadGroup, request, run_groups
+
+
+BENCH_EMAIL = "bench-async@example.com"
+PAGE_SIZE = 50
+
+app = FastAPI()
+
+
+def categories_stmt(user_id: int):
+    return select(Category).where(Category.user_id == user_id).order_by(Category.name)
+
+
+def transactions_stmt(user_id: int):
+    return (
+        select(Transaction)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .limit(PAGE_SIZE)
+    )
+
+
+@app.get("/sync/{user_id}/categories")
+def sync_categories(user_id: int, db: Session = Depends(get_db)):
+    return [c.name for c in db.scalars(categories_stmt(user_id)).all()]
+
+
+@app.get("/sync/{user_id}/transactions")
+def sync_transactions(user_id: int, db: Session = Depends(get_db)):
+    return [float(t.amount) for t in db.scalars(transactions_stmt(user_id)).all()]
+
+
+@app.get("/async/{user_id}/categories")
+async def async_categories(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    return [c.name for c in (await db.scalars(categories_stmt(user_id))).all()]
+
+
+@app.get("/async/{user_id}/transactions")
+async def async_transactions(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    return [float(t.amount) for t in (await db.scalars(transactions_stmt(user_id))).all()]
+
+
+def seed(transactions: int) -> int:
+    """Create the benchmark user with default categories and `transactions` rows; returns its id"""
+    from backend.app.provision import provision_users
+    from backend.app import rollup
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user_id = db.scalar(select(User.id).where(User.email == BENCH_EMAIL))
+        if user_id is not None:
+            return user_id
+        user_id = provision_users(db, 1, "!", email_template=BENCH_EMAIL)[0]
+        category_ids = db.scalars(select(Category.id).where(Category.user_id == user_id)).all()
+        now = datetime.utcnow()
+        rows = [
+            {
+                "amount": round(random.uniform(1, 500), 2),
+                "note": None,
+                "created_at": now - timedelta(minutes=i * 7),
+                "category_id": random.choice(category_ids),
+                "user_id": user_id,
+            }
+            for i in range(transactions)
+        ]
+        db.execute(insert(Transaction), rows)
+        rollup.add_rows(db, rows)
+        db.commit()
+        return user_id
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if request(url, "GET", "/docs", timeout=1)[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Server at {url} did not come up")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--transactions", type=int, default=5000)
+    args = parser.parse_args()
+
+    user_id = seed(args.transactions)
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.async_db:app", "--port", str(args.port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        wait_until_up(url)
+        result = {}
+        for mode in ("sync", "async"):
+            def call(mode=mode) -> int:
+                path = random.choice(("categories", "transactions"))
+                return request(url, "GET", f"/{mode}/{user_id}/{path}")[0]
+
+            result.update(run_groups([LoadGroup(mode, args.concurrency, call)], args.duration))
+        print(json.dumps(result, indent=2))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, Optional
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples (0 for an empty list)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: list[float], statuses: dict[int, int], elapsed: float) -> dict:
+    """Latency percentiles in milliseconds plus throughput and status counts"""
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def request(
+    base_url: str,
+    method: str,
+    path: str,
+    body: Optional[dict] = None,
+    token: Optional[str] = None,
+    timeout: float = 30,
+    headers: Optional[dict] = None,
+) -> tuple[int, bytes]:
+    """Minimal HTTP client on top of urllib, returning (status, body).
+
+    `body` is sent as JSON unless it is already bytes (then set Content-Type via `headers`).
+    """
+    if body is None or isinstance(body, bytes):
+        data = body
+    else:
+        data = json.dumps(body).encode()
+    req = urllib.request.Request(base_url.rstrip("/") + path, data=data, method=method)
+    if data is not None and not isinstance(body, bytes):
+        req.add_header("Content-Type", "application/json")
+    for name, value in (headers or {}).items():
+        req.add_header(name, value)
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def ensure_user(base_url: str, email: str, password: str) -> str:
+    """Register the user if needed and return an access token"""
+    request(base_url, "POST", "/auth/register", {"email": email, "password": password})
+    status, body = request(base_url, "POST", "/auth/login", {"email": email, "password": password})
+    if status != 200:
+        raise SystemExit(f"Login for {email} failed with {status}: {body[:200]!r}")
+    return json.loads(body)["access_token"]
+
+
+class LoadGroup:
+    """A set of client threads calling `call` in a loop until `stop` is set.
+
+    With `prepare`, each iteration first runs it untimed and passes its result
+    to `call` (e.g. create the row that the timed DELETE then removes).
+    """
+
+    def __init__(self, name: str, concurrency: int, call: Callable[..., int], prepare: Optional[Callable[[], object]] = None):
+        self.name = name
+        self.concurrency = concurrency
+        self.call = call
+        self.prepare = prepare
+        self.latencies: list[float] = []
+        self.statuses: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def _worker(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            args = ()
+            if self.prepare is not None:
+                try:
+                    args = (self.prepare(),)
+                except Exception:
+                    continue
+            start = time.perf_counter()
+            try:
+                status = self.call(*args)
+            except Exception:
+                status = 0
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies.append(elapsed)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def start(self, stop: threading.Event) -> None:
+        for _ in range(self.concurrency):
+            t = threading.Thread(target=self._worker, args=(stop,), daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def join(self) -> None:
+        for t in self._threads:
+            t.join()
+
+
+def run_groups(groups: list[LoadGroup], duration: float) -> dict:
+    """Run all groups concurrently for `duration` seconds and summarize each one"""
+    stop = threading.Event()
+    started = time.perf_counter()
+    for g in groups:
+        g.start(stop)
+    time.sleep(duration)
+    stop.set()
+    for g in groups:
+        g.join()
+    elapsed = time.perf_counter() - started
+    return {g.name: summarize(g.latencies, g.statuses, elapsed) for g in groups}
@@ -0,0 +1,82 @@
+"""Bytes on the wire and server CPU per response for each body format and Content-Encoding.
+
+Builds the bodies GET /transactions and GET /report/range send (from an
+in-memory SQLite database) and runs them through the same encoders the API
+uses: orjson or MessagePack, then identity, gzip, brotli or zstd from
+CompressionMiddleware. CPU is process time for serialization plus
+compression, averaged over --repeat runs.
+
+    python -m benchmarks.compression --rows 100 1000 10000
+"""
+import argparse
+import json
+import random
+import time
+
+import orjson
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from backend.app.compression import ENCODERS, compress
+from backend.app.db import Base
+from backend.app.encoding import MsgpackResponse, msgpack
+from backend.app.models import Transaction
+from backend.app.routes import TRANSACTION_COLUMNS
+from benchmarks.serialization import seed
+
+
+def transactions_body(db: Session, user_id: int, rows: int) -> list[dict]:
+    stmt = select(*TRANSACTION_COLUMNS).where(Transaction.user_id == user_id).order_by(Transaction.created_at.desc()).limit(rows)
+    keys = [column.key for column in TRANSACTION_COLUMNS]
+    return [dict(zip(keys, row)) for row in db.execute(stmt).all()]
+
+
+def report_body(rows: int) -> list[dict]:
+    """Shape of /report/range?bucket=day: one row per (day, category)"""
+    categories = [(f"Category {i}", "expense" if i else "income") for i in range(10)]
+    return [
+        {"bucket": f"2025-{1 + n // 280:02d}-{1 + n // 10 % 28:02d}", "category": name, "type": type_, "total": round(random.uniform(1, 900), 2)}
+        for n, (name, type_) in zip(range(rows), categories * (rows // len(categories) + 1))
+    ]
+
+
+def serializers() -> dict:
+    formats = {"json": orjson.dumps}
+    if msgpack is not None:
+        formats["msgpack"] = lambda content: MsgpackResponse(content).body
+    return formats
+
+
+def measure(content, serialize, encoding: str, repeat: int) -> dict:
+    started = time.process_time()
+    for _ in range(repeat):
+        body = serialize(content)
+        if encoding != "identity":
+            body = compress(encoding, body)
+    cpu = (time.process_time() - started) / repeat
+    return {"bytes": len(body), "cpu_us": round(cpu * 1e6, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    result = {}
+    with Session(engine) as db:
+        user_id = seed(db, max(args.rows))
+        for rows in args.rows:
+            for name, content in (("transactions", transactions_body(db, user_id, rows)), ("report_range", report_body(rows))):
+                result[f"{name}_{rows}"] = {
+                    f"{format_}+{encoding}": measure(content, serialize, encoding, args.repeat)
+                    for format_, serialize in serializers().items()
+                    for encoding in ("identity", *ENCODERS)
+                }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Login burst vs. regular traffic.
+
+Hammers /auth/login with one group of clients while another group keeps
+calling cheap authenticated endpoints, then reports p50/p95/p99 for both.
+With bcrypt on the request threadpool the "other" p99 climbs with the login
+concurrency; with the hashing pool it should stay close to the idle value,
+and logins beyond PASSWORD_HASH_MAX_PENDING show up as 503s.
+
+    ./backend/run_dev.sh   # or any running instance
+    python -m benchmarks.login_mixed_load --url http://localhost:8000
+"""
+import argparse
+import json
+
+from .common import LoadGroup, ensure_user, request, run_groups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    parser.add_argument("--other-concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--email", default="bench-login@example.com")
+    parser.add_argument("--password", default="bench-password")
+    args = parser.parse_args()
+
+    token = ensure_user(args.url, args.email, args.password)
+    credentials = {"email": args.email, "password": args.password}
+
+    def login() -> int:
+        return request(args.url, "POST", "/auth/login", credentials)[0]
+
+    def other() -> int:
+        return request(args.url, "GET", "/categories", token=token)[0]
+
+    groups = [
+        LoadGroup("login", args.login_concurrency, login),
+        LoadGroup("other", args.other_concurrency, other),
+    ]
+    # Baseline for the other endpoints without the login burst
+    idle = run_groups([LoadGroup("other_idle", args.other_concurrency, other)], min(args.duration, 5.0))
+    result = run_groups(groups, args.duration)
+    result.update(idle)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Synthetic data generator for benchmarks and load tests.
+
+Seeds the database behind DATABASE_URL (SQLite or PostgreSQL) with users,
+their default categories plus optional extra ones, and a realistic history of
+transactions: a monthly salary and the occasional side income, and expenses
+spread over waking hours with per-category frequencies and log-normal amounts.
+Activity is skewed, so a few heavy users own a large share of the rows, as in
+production. Everything is inserted in bulk, the rollup is rebuilt in one
+statement at the end, and a fixed --seed makes runs reproducible.
+
+    python -m benchmarks.seed --users 200 --transactions 500000 --reset
+
+Seeded users are bench+0@example.com ... with the password given by --password.
+"""
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from backend.app.auth import get_password_hash
+from backend.app.db import Base, SessionLocal, engine
+from backend.app.models import Category, Transaction
+from backend.app.provision import provision_users
+from backend.app import archive, migrations, rollup, search
+
+
+EMAIL_TEMPLATE = "bench+{i}@example.com"
+DEFAULT_PASSWORD = "bench-password"
+INSERT_BATCH_SIZE = 5000
+
+# Relative frequency and median amount (EUR) of expenses per default category
+EXPENSE_PROFILE = {
+    "Food": (22, 35),
+    "Eating Out": (12, 24),
+    "Household": (8, 30),
+    "Car": (6, 55),
+    "Relaxation": (5, 40),
+    "DM": (5, 18),
+    "Clothes": (4, 60),
+    "Sport": (3, 25),
+    "Mobile": (2, 30),
+    "Internet": (2, 40),
+    "Personal care": (2, 25),
+    "Home": (2, 150),
+    "Electronics": (1, 180),
+    "Travel": (1, 420),
+    "Insurance": (1, 95),
+    "Medication": (1, 20),
+    "Presents": (1, 45),
+}
+NOTES = [None, None, None, None, "card", "cash", "monthly", "with friends", "online order", "weekend"]
+
+
+def activity_weights(users: int, rng: random.Random) -> list[float]:
+    """Pareto-distributed share of the transactions per user"""
+    weights = [rng.paretovariate(1.5) for _ in range(users)]
+    total = sum(weights)
+    return [w / total for w in weights]
+
+
+def waking_time(day: datetime, rng: random.Random) -> datetime:
+    hour = min(23, max(6, int(rng.gauss(15, 4))))
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+
+def user_transactions(
+    user_id: int,
+    categories: dict[str, int],
+    count: int,
+    start: datetime,
+    end: datetime,
+    rng: random.Random,
+):
+    """Yield about `count` transaction rows for one user between start and end"""
+    months = []
+    month = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month < end:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+
+    income = []
+    salary = round(rng.gauss(3200, 900), -1)
+    for month in months:
+        if "Salary" in categories:
+            income.append(("Salary", salary, waking_time(month + timedelta(days=rng.randrange(3)), rng)))
+        if "Business" in categories and rng.random() < 0.3:
+            income.append(("Business", round(rng.lognormvariate(math.log(600), 0.6), 2), waking_time(month + timedelta(days=rng.randrange(28)), rng)))
+        if "Dividends" in categories and month.month % 3 == 0:
+            income.append(("Dividends", round(rng.lognormvariate(math.log(80), 0.5), 2), waking_time(month + timedelta(days=14), rng)))
+    for name, amount, created_at in income[:count]:
+        if start <= created_at < end:
+            yield {"amount": amount, "note": None, "created_at": created_at, "category_id": categories[name], "user_id": user_id}
+
+    names = [name for name in categories if name in EXPENSE_PROFILE] or [name for name in categories]
+    weights = [EXPENSE_PROFILE.get(name, (1, 40))[0] for name in names]
+    span_days = max(1, (end - start).days)
+    for name in rng.choices(names, weights=weights, k=max(0, count - len(income))):
+        median = EXPENSE_PROFILE.get(name, (1, 40))[1]
+        day = start + timedelta(days=rng.randrange(span_days))
+        yield {
+            "amount": round(max(0.5, rng.lognormvariate(math.log(median), 0.7)), 2),
+            "note": rng.choice(NOTES),
+            "created_at": waking_time(day, rng),
+            "category_id": categories[name],
+            "user_id": user_id,
+        }
+
+
+def seed(
+    users: int,
+    transactions: int,
+    extra_categories: int = 0,
+    months: int = 24,
+    password: str = DEFAULT_PASSWORD,
+    seed_value: int = 42,
+    reset: bool = False,
+) -> dict:
+    """Populate the database and return what was created (plus timings)"""
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    if reset:
+        search.drop_search_index(engine)
+        archive.transactions_archive.drop(bind=engine, checkfirst=True)
+        Base.metadata.drop_all(bind=engine)
+    # Also creates the search triggers, which index the transactions as they are inserted
+    migrations.upgrade(engine)
+
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=30 * months)
+    inserted = 0
+    with SessionLocal() as db:
+        user_ids = provision_users(db, users, get_password_hash(password), EMAIL_TEMPLATE)
+        if extra_categories:
+            db.execute(insert(Category), [
+                {"name": f"Custom {n}", "type": rng.choice(("expense", "expense", "income")), "user_id": user_id, "created_at": end}
+                for user_id in user_ids
+                for n in range(extra_categories)
+            ])
+            db.commit()
+
+        categories: dict[int, dict[str, int]] = {}
+        for id_, name, user_id in db.execute(
+            select(Category.id, Category.name, Category.user_id).where(Category.user_id.in_(user_ids))
+        ):
+            categories.setdefault(user_id, {})[name] = id_
+
+        batch = []
+        for user_id, share in zip(user_ids, activity_weights(len(user_ids), rng)):
+            for row in user_transactions(user_id, categories.get(user_id, {}), round(transactions * share), start, end, rng):
+                batch.append(row)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    db.execute(insert(Transaction), batch)
+                    inserted += len(batch)
+                    batch = []
+        if batch:
+            db.execute(insert(Transaction), batch)
+            inserted += len(batch)
+        db.commit()
+
+        rollup.rebuild(db)
+        db.commit()
+        total = db.scalar(select(func.count()).select_from(Transaction))
+
+    return {
+        "users_created": len(user_ids),
+        "transactions_inserted": inserted,
+        "transactions_total": total,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=100000, help="total across all users")
+    parser.add_argument("--extra-categories", type=int, default=0, help="custom categories per user on top of the defaults")
+    parser.add_argument("--months", type=int, default=24, help="history length")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+    print(json.dumps(seed(args.users, args.transactions, args.extra_categories, args.months, args.password, args.seed, args.reset), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Per-row cost of the list endpoints' serialization, before and after the fast path.
+
+"orm_pydantic" is what GET /transactions used to do: load ORM objects, validate
+each through TransactionSchema (from_attributes) and JSON-encode the result the
+way FastAPI does for a response_model. "columns_orjson" is the current path:
+select the columns as tuples and encode them with orjson in one pass. Both run
+on the same in-memory SQLite database, so the numbers include the query.
+
+    python -m benchmarks.serialization --rows 10000 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from backend.app.db import Base
+from backend.app.models import Category, Transaction, User
+from backend.app.routes import TRANSACTION_COLUMNS
+from backend.app.schemas import TransactionSchema
+
+
+transactions_adapter = TypeAdapter(list[TransactionSchema])
+
+
+def seed(db: Session, rows: int) -> int:
+    user = User(email="bench-serialization@example.com", hashed_password="!", is_active=True)
+    db.add(user)
+    db.flush()
+    category_ids = []
+    for i in range(10):
+        category = Category(name=f"Category {i}", type="expense" if i else "income", user_id=user.id)
+        db.add(category)
+        db.flush()
+        category_ids.append(category.id)
+    now = datetime.utcnow()
+    db.execute(insert(Transaction), [
+        {
+            "amount": round(random.uniform(1, 500), 2),
+            "note": random.choice((None, "groceries", "rent", "coffee with a client")),
+            "created_at": now - timedelta(minutes=i),
+            "category_id": random.choice(category_ids),
+            "user_id": user.id,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    return user.id
+
+
+def orm_pydantic(db: Session, user_id: int, limit: int) -> bytes:
+    stmt = select(Transaction).where(Transaction.user_id == user_id).order_by(Transaction.created_at.desc()).limit(limit)
+    items = transactions_adapter.validate_python(db.scalars(stmt).all(), from_attributes=True)
+    return json.dumps(transactions_adapter.dump_python(items, mode="json")).encode()
+
+
+def columns_orjson(db: Session, user_id: int, limit: int) -> bytes:
+    stmt = select(*TRANSACTION_COLUMNS).where(Transaction.user_id == user_id).order_by(Transaction.created_at.desc()).limit(limit)
+    keys = [column.key for column in TRANSACTION_COLUMNS]
+    return orjson.dumps([dict(zip(keys, row)) for row in db.execute(stmt).all()])
+
+
+def measure(fn, db: Session, user_id: int, rows: int, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()  # no identity-map hits between rounds
+        started = time.perf_counter()
+        fn(db, user_id, rows)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {"best_ms": round(best * 1000, 2), "per_row_us": round(best / rows * 1e6, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    result = {}
+    with Session(engine) as db:
+        user_id = seed(db, max(args.rows))
+        for rows in args.rows:
+            before = measure(orm_pydantic, db, user_id, rows, args.repeat)
+            after = measure(columns_orjson, db, user_id, rows, args.repeat)
+            result[str(rows)] = {
+                "orm_pydantic": before,
+                "columns_orjson": after,
+                "speedup": round(before["best_ms"] / after["best_ms"], 2),
+            }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""Endpoint benchmark suite.
+
+Drives every endpoint of routes.py and auth_routes.py, one scenario at a time,
+with a fixed number of concurrent clients, and writes p50/p95/p99 latency and
+throughput per scenario as JSON. Reads run first, then writes, then the
+bcrypt-bound auth endpoints, so a run is repeatable on a freshly seeded DB.
+
+By default the app is served in-process (uvicorn on a background thread of
+this process, against DATABASE_URL); pass --url to benchmark a separately
+started local uvicorn instead, which keeps the client threads off the server's
+GIL. Seed first, here or with `python -m benchmarks.seed`:
+
+    python -m benchmarks.suite --seed-users 100 --seed-transactions 200000 --reset \\
+        --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.suite --output new.json --baseline bench-abc1234.json
+
+With --baseline, each scenario also gets its relative change against that
+file and scenarios whose p99 grew by more than --regression-pct are listed.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Optional
+from urllib.parse import urlencode
+
+from .common import LoadGroup, request, run_groups
+from .seed import DEFAULT_PASSWORD, EMAIL_TEMPLATE
+
+
+class Client:
+    """A logged-in seeded user plus ids the write scenarios can work with"""
+
+    def __init__(self, url: str, email: str, password: str):
+        self.url = url
+        status, body = request(url, "POST", "/auth/login", {"email": email, "password": password})
+        if status != 200:
+            raise SystemExit(f"Login for {email} failed with {status}; seed the database first (see --seed-users)")
+        self.email = email
+        self.token = json.loads(body)["access_token"]
+        categories = self.get_json("/categories")
+        self.category_ids = [c["id"] for c in categories]
+        self.expense_category_id = next((c["id"] for c in categories if c["type"] == "expense"), self.category_ids[0])
+        status, body, headers = self.get_with_headers("/transactions?limit=200")
+        self.transaction_ids = [t["id"] for t in json.loads(body)] or [self.create_transaction()]
+        self.next_cursor = headers.get("X-Next-Cursor", "")
+        self.balance_etag = self.get_with_headers("/balance")[2].get("ETag", "")
+
+    def call(self, method: str, path: str, body=None, headers: Optional[dict] = None) -> int:
+        return request(self.url, method, path, body, token=self.token, headers=headers)[0]
+
+    def get_json(self, path: str):
+        status, body = request(self.url, "GET", path, token=self.token)
+        return json.loads(body)
+
+    def get_with_headers(self, path: str):
+        req = urllib.request.Request(self.url.rstrip("/") + path)
+        req.add_header("Authorization", f"Bearer {self.token}")
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            # resp.headers is case-insensitive; uvicorn sends header names in lowercase
+            return resp.status, resp.read(), resp.headers
+
+    def create_transaction(self) -> int:
+        status, body = request(self.url, "POST", "/transactions", transaction_body(self), token=self.token)
+        return json.loads(body)["id"]
+
+    def create_category(self) -> int:
+        status, body = request(self.url, "POST", "/categories", {"name": f"bench-{uuid.uuid4().hex[:12]}", "type": "expense"}, token=self.token)
+        return json.loads(body)["id"]
+
+
+def transaction_body(client: Client) -> dict:
+    return {
+        "amount": round(random.uniform(1, 200), 2),
+        "category_id": client.expense_category_id,
+        "note": "bench",
+        "created_at": (datetime.utcnow() - timedelta(minutes=random.randrange(60 * 24 * 365))).isoformat(),
+    }
+
+
+def multipart_csv(rows: int, category_id: int) -> tuple[bytes, str]:
+    lines = ["amount,created_at,note,category_id"]
+    now = datetime.utcnow()
+    for i in range(rows):
+        lines.append(f"{random.uniform(1, 200):.2f},{(now - timedelta(hours=i)).isoformat()},csv bench,{category_id}")
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="bench.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+        + "\n".join(lines)
+        + f"\r\n--{boundary}--\r\n"
+    ).encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def scenarios(clients: list[Client], url: str, password: str) -> list[tuple[str, object, object]]:
+    """(name, call, prepare) for every endpoint, reads first"""
+    today = date.today()
+    month_start = today.replace(day=1)
+    last_month = (month_start - timedelta(days=1)).replace(day=1)
+    half_year_ago = (today - timedelta(days=182)).isoformat()
+
+    def pick() -> Client:
+        return random.choice(clients)
+
+    def get(path: str):
+        return lambda: pick().call("GET", path)
+
+    def get_next_page() -> int:
+        client = pick()
+        return client.call("GET", f"/transactions?limit=50&cursor={client.next_cursor}")
+
+    def balance_etag_hit() -> int:
+        client = pick()
+        return client.call("GET", "/balance", headers={"If-None-Match": client.balance_etag})
+
+    def prepare_with(create):
+        def prepare():
+            client = pick()
+            return client, create(client)
+        return prepare
+
+    def create_transaction() -> int:
+        client = pick()
+        return client.call("POST", "/transactions", transaction_body(client))
+
+    def update_transaction() -> int:
+        client = pick()
+        return client.call("PUT", f"/transactions/{random.choice(client.transaction_ids)}", transaction_body(client))
+
+    def delete_transaction(prepared) -> int:
+        client, transaction_id = prepared
+        return client.call("DELETE", f"/transactions/{transaction_id}")
+
+    def bulk_transactions() -> int:
+        client = pick()
+        return client.call("POST", "/transactions/bulk", [transaction_body(client) for _ in range(50)])
+
+    def import_csv(prepared) -> int:
+        client, (body, content_type) = prepared
+        return client.call("POST", "/import/csv", body, headers={"Content-Type": content_type})
+
+    def create_category() -> int:
+        client = pick()
+        return client.call("POST", "/categories", {"name": f"bench-{uuid.uuid4().hex[:12]}", "type": "expense"})
+
+    def update_category(prepared) -> int:
+        client, category_id = prepared
+        return client.call("PUT", f"/categories/{category_id}", {"name": f"bench-{uuid.uuid4().hex[:12]}", "type": "income"})
+
+    def delete_category(prepared) -> int:
+        client, category_id = prepared
+        return client.call("DELETE", f"/categories/{category_id}")
+
+    def login() -> int:
+        return request(url, "POST", "/auth/login", {"email": pick().email, "password": password})[0]
+
+    def register() -> int:
+        return request(url, "POST", "/auth/register", {"email": f"bench-reg-{uuid.uuid4().hex}@example.com", "password": password})[0]
+
+    return [
+        ("auth_me", get("/auth/me"), None),
+        ("categories_list", get("/categories"), None),
+        ("transactions_page", get("/transactions?limit=50"), None),
+        ("transactions_next_page", get_next_page, None),
+        ("transactions_search", get("/transactions/search?q=card"), None),
+        ("transactions_search_two_terms", get("/transactions/search?" + urlencode({"q": "onl food", "limit": 20})), None),
+        ("transactions_filtered", get("/transactions?" + urlencode({"limit": 50, "type": "expense", "from": half_year_ago})), None),
+        ("sync_full", get("/sync"), None),
+        ("sync_delta", get("/sync?since=1"), None),
+        ("balance", get("/balance"), None),
+        ("balance_etag_hit", balance_etag_hit, None),
+        ("dashboard", get("/dashboard?timezone=Europe/Berlin"), None),
+        ("report_month", get(f"/report/month?year={last_month.year}&month={last_month.month}&timezone=Europe/Berlin"), None),
+        ("report_day", get(f"/report/day?year={today.year}&month={today.month}&day={today.day}"), None),
+        ("report_range_week", get(f"/report/range?from={half_year_ago}&to={today.isoformat()}&bucket=week&timezone=Europe/Berlin"), None),
+        ("export_csv_month", get(f"/export/csv?from={last_month.isoformat()}&to={month_start.isoformat()}"), None),
+        ("export_parquet_month", get(f"/export/parquet?from={last_month.isoformat()}&to={month_start.isoformat()}"), None),
+        ("transaction_create", create_transaction, None),
+        ("transaction_update", update_transaction, None),
+        ("transaction_delete", delete_transaction, prepare_with(Client.create_transaction)),
+        ("transactions_bulk_50", bulk_transactions, None),
+        ("import_csv_200", import_csv, prepare_with(lambda client: multipart_csv(200, client.expense_category_id))),
+        ("category_create", create_category, None),
+        ("category_update", update_category, prepare_with(Client.create_category)),
+        ("category_delete", delete_category, prepare_with(Client.create_category)),
+        ("setup_default_categories", lambda: pick().call("POST", "/auth/setup-default-categories"), None),
+        ("auth_login", login, None),
+        ("auth_register", register, None),
+    ]
+
+
+def start_in_process_server(port: int):
+    """Serve backend.app.main on a thread of this process; returns (base URL, stop function)"""
+    import uvicorn
+
+    from backend.app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server.install_signal_handlers = lambda: None
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 60
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise SystemExit("In-process server did not start")
+        time.sleep(0.1)
+
+    def stop() -> None:
+        # Runs the app's shutdown handlers, which close the DB pools and hashing workers
+        server.should_exit = True
+        thread.join()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, regression_pct: float) -> list[str]:
+    """Annotate results with their change against a baseline run; returns the regressed scenarios"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        change = {}
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before.get(key):
+                change[f"{key}_pct"] = round((current[key] - before[key]) / before[key] * 100, 1)
+        current["change"] = change
+        if change.get("p99_ms_pct", 0) > regression_pct:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="benchmark a running server instead of serving in-process")
+    parser.add_argument("--port", type=int, default=8766, help="port of the in-process server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--auth-concurrency", type=int, default=4, help="clients for login/register (bcrypt-bound)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--users", type=int, default=8, help="seeded users to spread the load over")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--seed-users", type=int, default=0, help="seed this many users before running")
+    parser.add_argument("--seed-transactions", type=int, default=100000)
+    parser.add_argument("--reset", action="store_true", help="with --seed-users: drop and recreate tables first")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--regression-pct", type=float, default=20.0)
+    args = parser.parse_args()
+
+    random.seed(1234)
+    seeded = None
+    if args.seed_users:
+        from .seed import seed
+
+        seeded = seed(args.seed_users, args.seed_transactions, password=args.password, reset=args.reset)
+
+    if args.url:
+        url, stop = args.url, None
+    else:
+        url, stop = start_in_process_server(args.port)
+    try:
+        clients = [Client(url, EMAIL_TEMPLATE.format(i=i), args.password) for i in range(args.users)]
+        results = {}
+        for name, call, prepare in scenarios(clients, url, args.password):
+            if args.only and name not in args.only:
+                continue
+            concurrency = args.auth_concurrency if name.startswith("auth_") and name != "auth_me" else args.concurrency
+            results.update(run_groups([LoadGroup(name, concurrency, call, prepare)], args.duration))
+    finally:
+        if stop is not None:
+            stop()
+
+    from backend.app.db import DATABASE_URL
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "target": args.url or f"in-process ({DATABASE_URL.split(':', 1)[0]})",
+            "concurrency": args.concurrency,
+            "auth_concurrency": args.auth_concurrency,
+            "duration_s": args.duration,
+            "users": args.users,
+            "python": platform.python_version(),
+            "seeded": seeded,
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.regression_pct)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()